@@ -1,10 +1,16 @@
 import io
+from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Union
 
 from cat_file.errors import NoFileTypeFoundError
+from cat_file.errors import WrongFileTypeError
 from cat_file.filetypes import filetype
+from cat_file.filters import Filter
 from cat_file.logging import logger as __logger
+from cat_file.stream import read_prefix
 
 
 logger = __logger.getChild(__name__)
@@ -17,12 +23,30 @@ class CatFile:
         file_type_flag: Optional[str] = None,
         describe: bool = False,
         num_lines_to_print: Optional[int] = None,
+        path: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        where: Optional[Filter] = None,
+        schema: bool = False,
+        flatten: bool = False,
+        sheet: Optional[str] = None,
+        list_sheets: bool = False,
+        all_sheets: bool = False,
+        metadata_only: bool = False,
     ) -> None:
         self._buffer = buffer
+        self._path = path
         self._file_type_flag = file_type_flag
         self._file = None
         self._describe = describe
+        self._schema = schema
         self._num_lines_to_print = num_lines_to_print
+        self._columns = columns
+        self._where = where
+        self._flatten = flatten
+        self._sheet = sheet
+        self._list_sheets = list_sheets
+        self._all_sheets = all_sheets
+        self._metadata_only = metadata_only
 
     def set_file_type(self) -> None:
         """
@@ -47,7 +71,8 @@ class CatFile:
         Returns:
             A `str` with the suspected file type.
         """
-        for code, cls in filetype:
+        prefix = read_prefix(self._buffer, filetype.max_signature_length)
+        for code, cls in filetype.candidates(prefix, self._path):
             logger.debug(f"Checking if {cls.__name__} is the correct file type")
             if cls.is_valid_input(self._buffer):
                 logger.debug(f"The file type {cls.__name__} matches the given input")
@@ -59,15 +84,66 @@ class CatFile:
             raise NoFileTypeFoundError()
 
         cls = filetype.get_class(self._file_type_flag)
-        self._file = cls.from_bytes_stream(self._buffer)
+        self._file = cls.from_bytes_stream(self._buffer, sheet=self._sheet, **self._loading_options())
+
+    def _loading_options(self) -> Dict[str, Any]:
+        cls = filetype.get_class(self._file_type_flag)
+        return dict(
+            num_lines=None if self._describe or self._schema else self._num_lines_to_print,
+            columns=self._columns,
+            where=self._where,
+            flatten=self._flatten or None,
+            **cls.sniffed_options(self._buffer),
+        )
+
+    def print_metadata_to_screen(self) -> bool:
+        """
+        Describes the file, or prints its schema or its sheets, from its metadata alone when the file type supports it
+
+        Returns:
+            `True` if the output was printed; `False` if the file has to be loaded first
+        """
+        cls = filetype.get_class(self._file_type_flag)
+        if self._list_sheets:
+            if not cls.list_sheets_stream(self._buffer):
+                raise WrongFileTypeError("Excel")
+            return True
+
+        if self._where is not None or self._flatten or not (self._describe or self._schema):
+            return False
+        if self._describe:
+            return cls.describe_stream(
+                self._buffer, columns=self._columns, sheet=self._sheet, metadata_only=self._metadata_only
+            )
+        return cls.schema_stream(self._buffer, columns=self._columns, sheet=self._sheet)
 
     def print_file_to_screen(self) -> None:
         if self._describe:
             self._file.describe()
+        elif self._schema:
+            self._file.schema()
         else:
             self._file.print(num_lines=self._num_lines_to_print)
 
+    def print_sheets_to_screen(self) -> None:
+        """
+        Loads every sheet of the file, and prints each of them (or describes it, or prints its schema) in turn
+        """
+        cls = filetype.get_class(self._file_type_flag)
+        sheets = cls.sheets_from_bytes_stream(self._buffer, **self._loading_options())
+        if sheets is None:
+            raise WrongFileTypeError("Excel")
+        for name, self._file in sheets:
+            print("=" * 100)
+            print(f"\tSheet: {name}")
+            self.print_file_to_screen()
+
     def run(self) -> None:
         self.set_file_type()
+        if self._all_sheets:
+            self.print_sheets_to_screen()
+            return
+        if self.print_metadata_to_screen():
+            return
         self.load_file_from_buffer()
         self.print_file_to_screen()
@@ -66,6 +66,45 @@ Otherwise, the program will attempt to infer the file's type.
     )
 
     head_tail_group.add_argument("--describe", help="Describe the metadata of the file", action="store_true")
+    head_tail_group.add_argument("--schema", help="Print the names and the types of the columns", action="store_true")
+    head_tail_group.add_argument("--list-sheets", help="Print the sheets of an Excel workbook", action="store_true")
+    parser.add_argument(
+        "--columns",
+        help="Comma-separated names of the columns to load. Other columns are not read at all",
+        type=str,
+        metavar="A,B,C",
+    )
+    parser.add_argument(
+        "--where",
+        help="Only print the rows which match a filter, e.g. \"ts >= '2026-01-01' and user_id == 42\".\n"
+        "Supports comparisons, `in`, `and`, `or` and `not`. Parquet files skip row groups which cannot match",
+        type=str,
+        metavar="EXPR",
+    )
+    sheets_group = parser.add_mutually_exclusive_group()
+    sheets_group.add_argument(
+        "--sheet",
+        help="The name or the (zero based) index of the Excel sheet to read. Default is the first sheet",
+        type=str,
+        metavar="SHEET",
+    )
+    sheets_group.add_argument(
+        "--all-sheets",
+        help="Read every sheet of an Excel workbook, in parallel, and print the output of each one in turn",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--metadata-only",
+        help="With `--describe`, describe xlsx sheets from their metadata and header row without loading\n"
+        "their cells. The null and unique value counts are left out, and formatted blank rows are counted",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--flatten",
+        help="Flatten nested (struct) columns into a column per field, named by its dotted path (e.g. `a.b.c`).\n"
+        "Dotted names can then be passed to `--columns` and `--where`",
+        action="store_true",
+    )
     if not should_read_from_stdin():
         parser.add_argument(
             "path",
@@ -1,7 +1,16 @@
+def _rebuild_exception(cls: type, args: tuple) -> Exception:
+    return cls.__new__(cls, *args)
+
+
 class CatFileException(Exception):
     def __init__(self, *args: object, **kwargs: object) -> None:
         super().__init__(*args, **kwargs)
 
+    def __reduce__(self) -> tuple:
+        # The subclasses take other arguments than their messages, so they are unpickled (e.g. when they
+        # are raised in a worker process) without calling `__init__` again
+        return _rebuild_exception, (type(self), self.args)
+
 
 class WrongFileTypeError(CatFileException):
     def __init__(self, expected_type: str) -> None:
@@ -18,6 +27,21 @@ class DuplicateFileTypeCodeError(CatFileException):
         super().__init__(f"The code - {provided_code} - for the class - {provided_class} - is already in use.")
 
 
+class ColumnNotFoundError(CatFileException):
+    def __init__(self, missing_columns: object) -> None:
+        super().__init__(f"The columns {missing_columns} were not found in the file")
+
+
 class NoFileTypeFoundError(CatFileException):
     def __init__(self, *args: object, **kwargs: object) -> None:
         super().__init__("No file type was found for the provided input", *args, **kwargs)
+
+
+class InvalidFilterError(CatFileException):
+    def __init__(self, expression: str, reason: str) -> None:
+        super().__init__(f"Invalid filter expression - {expression} - {reason}")
+
+
+class SheetNotFoundError(CatFileException):
+    def __init__(self, sheet: str, sheet_names: object) -> None:
+        super().__init__(f"The sheet {sheet} was not found in the workbook, which has the sheets {sheet_names}")
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import io
+import os
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cat_file.errors import ColumnNotFoundError
+from cat_file.filters import Filter
+from cat_file.logging import logger as _l
+from cat_file.stream import get_buffer
+from cat_file.stream import is_random_access
+
+logger = _l.getChild(__name__)
+
+# The number of bytes which pyarrow parses at a time (and per thread) when reading text formats
+BLOCK_SIZE = int(os.environ.get("CAT_FILE_BLOCK_SIZE", 4 * 1024 * 1024))
+# The largest block pyarrow is given at once, as its block sizes are 32-bit integers
+MAX_BLOCK_SIZE = 1024 * 1024 * 1024
+
+
+def as_arrow_input(stream: io.BytesIO) -> Union[pa.BufferReader, io.BytesIO]:
+    """
+    Returns an input which pyarrow can read `stream` from. Streams backed by a buffer (e.g.
+    memory-mapped files) are wrapped without copying, and other streams are returned as is.
+
+    Args:
+        stream: A stream object positioned at its start
+    """
+    view = get_buffer(stream) if is_random_access(stream) else None
+    return pa.BufferReader(pa.py_buffer(view)) if view is not None else stream
+
+
+def _nested_types_mapper(arrow_type: pa.DataType) -> Optional[Any]:
+    # Keep nested columns in Arrow memory instead of building a Python object per value
+    if pa.types.is_nested(arrow_type) and hasattr(pd, "ArrowDtype"):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def table_to_dataframe(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts a `pa.Table` to a `pd.DataFrame`, releasing the table's memory while converting.
+    Nested (struct, list and map) columns are kept as Arrow-backed columns.
+
+    Args:
+        table: A `pa.Table`, which should not be used afterwards
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True, types_mapper=_nested_types_mapper)
+
+
+def flatten_structs(table: pa.Table) -> pa.Table:
+    """
+    Replaces the struct columns of `table`, recursively, with a column per field, named
+    `<column>.<field>`. The fields' values are not copied, only the validity of fields
+    under null structs is combined with theirs.
+
+    Args:
+        table: A `pa.Table`
+    """
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    return table
+
+
+def select_columns(schema: pa.Schema, columns: Optional[Sequence[str]]) -> List[str]:
+    """
+    Returns:
+        The names of the requested `columns`, or of all the columns in `schema` except
+        for the ones which store the index of a `pd.DataFrame`
+    """
+    if columns is None:
+        pandas_metadata = schema.pandas_metadata or {}
+        index_columns = {c for c in pandas_metadata.get("index_columns", []) if isinstance(c, str)}
+        return [name for name in schema.names if name not in index_columns]
+
+    missing_columns = [column for column in columns if column not in schema.names]
+    if missing_columns:
+        raise ColumnNotFoundError(missing_columns)
+    return list(columns)
+
+
+def count_distinct(column: pa.ChunkedArray) -> Optional[int]:
+    """
+    Returns:
+        The number of unique non-null values in `column`, or `None` if its type can't be counted
+    """
+    try:
+        if pa.types.is_dictionary(column.type):
+            # Once the chunks share a dictionary, equal values have equal indices
+            column = pa.chunked_array(
+                [chunk.indices for chunk in column.unify_dictionaries().chunks], type=column.type.index_type
+            )
+        return pc.count_distinct(column).as_py()
+    except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+        return None
+
+
+def root_columns(
+    schema: pa.Schema, columns: Optional[Sequence[str]], where: Optional[Filter], flatten: bool
+) -> Optional[List[str]]:
+    """
+    Returns:
+        The names of the columns of `schema` which have to be read for the requested `columns` and the
+        columns `where` refers to (for flattened names, their top-level struct columns), or `None` to
+        read every column
+    """
+    if columns is None:
+        return None
+    needed = [*columns, *(where.columns if where is not None else ())]
+    roots = {column.split(".")[0] if flatten else column for column in needed}
+    return [name for name in schema.names if name in roots]
+
+
+def prepare_table(table: pa.Table, where: Optional[Filter], flatten: bool) -> pa.Table:
+    """
+    Flattens a decoded `table` if needed, and selects the rows of it which match `where`
+    """
+    if flatten:
+        table = flatten_structs(table)
+    if where is None:
+        return table
+
+    missing_columns = [column for column in where.columns if column not in table.column_names]
+    if missing_columns:
+        raise ColumnNotFoundError(missing_columns)
+    return table.filter(where.to_arrow(table.schema))
+
+
+def select_table_columns(table: pa.Table, columns: Optional[Sequence[str]]) -> pa.Table:
+    """
+    Selects the requested `columns` of `table`, in the requested order
+    """
+    if columns is None:
+        return table
+
+    missing_columns = [column for column in columns if column not in table.column_names]
+    if missing_columns:
+        raise ColumnNotFoundError(missing_columns)
+    return table.select(list(columns))
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
 import abc
+import inspect
 import io
 from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterator
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
 
 import pandas as pd
 from tabulate import tabulate
 
+from cat_file.errors import ColumnNotFoundError
 from cat_file.filetypes._manager import filetype
+from cat_file.filters import Filter
 from cat_file.logging import logger as _l
+from cat_file.stream import ensure_random_access
 from cat_file.stream import zero_buffer
 
 logger = _l.getChild(__name__)
@@ -21,6 +29,11 @@ class DataFile(abc.ABC):
     A class implementation of a DataFile.
     """
 
+    # Whether `stream_to_dataframe` needs to seek around the whole input (e.g. to read a footer).
+    # File types which are parsed front to back can set this to `False` in order to read
+    # piped inputs lazily.
+    requires_random_access: bool = True
+
     def __init__(self, contents: pd.DataFrame, path: Optional[Path] = None) -> None:
         self._contents = contents
         self._path = Path(path) if path is not None else path
@@ -69,27 +82,184 @@ class DataFile(abc.ABC):
         logger.debug("Describing data")
         output = pd.DataFrame(index=pd.Index(self.columns, name="Columns"))
         output["Null Count"] = self.contents.isnull().sum()
-        output["# Unique"] = self.contents.nunique()
+        output["# Unique"] = self.contents.apply(self._count_unique)
+        self._print_description(self.contents.shape[0], output)
+
+    @staticmethod
+    def _count_unique(series: pd.Series) -> int:
+        try:
+            return series.nunique()
+        except TypeError:
+            # Nested values (e.g. lists and dicts) are not hashable, so they are compared by their representation
+            return series.dropna().map(repr).nunique()
+
+    def schema(self) -> None:
+        """
+        Prints the names and the types of the columns
+        """
+        logger.debug("Printing the schema")
+        output = pd.DataFrame(index=pd.Index(self.columns, name="Columns"))
+        output["Type"] = self.contents.dtypes.astype(str)
+        self._print_schema(output)
+
+    @classmethod
+    def describe_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        """
+        Describes the file in `buffer` from its metadata, without loading its contents.
+        File types which store statistics about their contents (e.g. in a footer) can override it.
+
+        Args:
+            buffer: A `io.BytesIO` object with the contents of the file
+            columns: The names of the columns to describe, or `None` to describe all of them
+            **options: The loading options (e.g. `sheet`), which implementations may use
+
+        Returns:
+            `True` if the file was described; `False` if it has to be loaded in order to describe it
+        """
+        return False
+
+    @classmethod
+    def schema_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        """
+        Prints the schema of the file in `buffer` from its metadata, without loading its contents.
+
+        Args:
+            buffer: A `io.BytesIO` object with the contents of the file
+            columns: The names of the columns to print, or `None` to print all of them
+            **options: The loading options (e.g. `sheet`), which implementations may use
+
+        Returns:
+            `True` if the schema was printed; `False` if the file has to be loaded in order to print it
+        """
+        return False
+
+    @classmethod
+    def list_sheets_stream(cls, buffer: io.BytesIO) -> bool:
+        """
+        Prints the sheets of the file in `buffer`. File types which have sheets override it.
+
+        Args:
+            buffer: A `io.BytesIO` object with the contents of the file
+
+        Returns:
+            `True` if the sheets were printed; `False` if the file type does not have sheets
+        """
+        return False
+
+    @classmethod
+    def sheets_from_bytes_stream(cls, buffer: io.BytesIO, **options: Any) -> Optional[Iterator[Tuple[str, DataFile]]]:
+        """
+        Loads every sheet of the file in `buffer`. File types which have sheets override it.
+
+        Args:
+            buffer: A `io.BytesIO` object with the contents of the file
+            **options: Loading options, as in `from_bytes_stream`
+
+        Returns:
+            An iterator of the names and the contents of the sheets, in the order of the sheets, or `None`
+            if the file type does not have sheets
+        """
+        return None
+
+    @staticmethod
+    def _print_description(num_rows: int, output: pd.DataFrame) -> None:
+        """
+        Prints the number of rows, and `output`, which has a row per column of the file
+        """
         print("~" * 100)
-        print(f"\n\n\t# Rows: {self.contents.shape[0]:,}\n\t# Columns: {self.contents.shape[1]:,}\n\n")
+        print(f"\n\n\t# Rows: {num_rows:,}\n\t# Columns: {output.shape[0]:,}\n\n")
         print(tabulate(output.sort_index(), headers="keys", tablefmt="grid", stralign="center", numalign="center"))
 
+    @staticmethod
+    def _print_schema(output: pd.DataFrame) -> None:
+        """
+        Prints `output`, which has a row per column of the file, in the order of the columns
+        """
+        print("~" * 100, end="\n\n")
+        print(tabulate(output, headers="keys", tablefmt="grid", stralign="center", numalign="center"))
+
     @classmethod
-    def from_bytes_stream(cls, buffer: io.BytesIO) -> DataFile:
+    def from_bytes_stream(cls, buffer: io.BytesIO, **options: Any) -> DataFile:
         """
         An alternative constructor for the class for reading file streams
 
         Args:
             buffer: A `io.BytesIO` object
+            **options: Loading options (e.g. `num_lines`) which are passed on to
+                `stream_to_dataframe` if it accepts them
         """
         logger.debug(f"Loading the {cls.__name__} stream to a DataFrame")
+        columns = options.get("columns")
+        where = options.get("where")
+        parameters = inspect.signature(cls.stream_to_dataframe).parameters
+        if where is not None and "where" not in parameters:
+            # The filter is applied after loading, so every row, and every column it refers to, has to be loaded
+            logger.debug(f"{cls.__name__} does not push `where` down, filtering the loaded rows instead")
+            options["num_lines"] = None
+            if columns is not None:
+                options["columns"] = [*columns, *(column for column in where.columns if column not in columns)]
+        for name, value in options.items():
+            if name not in parameters and name != "where" and value is not None:
+                logger.debug(f"{cls.__name__} does not support the `{name}` option, ignoring it")
+        options = {name: value for name, value in options.items() if name in parameters}
+
         with zero_buffer(buffer) as b:
             try:
-                return cls(cls.stream_to_dataframe(b))
+                if cls.requires_random_access:
+                    b = ensure_random_access(b)
+                df = cls.stream_to_dataframe(b, **options)
+                if where is not None and "where" not in parameters:
+                    df = cls._filter(df, where)
+                return cls(cls._project(df, columns))
             except Exception:
                 logger.error("Loading failed :(")
                 raise
 
+    @staticmethod
+    def _filter(df: pd.DataFrame, where: Filter) -> pd.DataFrame:
+        """
+        Selects the rows of `df` which match `where`
+        """
+        missing_columns = [column for column in where.columns if column not in df.columns]
+        if missing_columns:
+            raise ColumnNotFoundError(missing_columns)
+        return df[where.to_mask(df)].reset_index(drop=True)
+
+    @staticmethod
+    def _number_tail(df: pd.DataFrame, num_rows: int) -> pd.DataFrame:
+        """
+        Numbers the rows of `df`, the last rows of a file with `num_rows` rows, by their positions
+        in the file, like `pd.DataFrame.tail` does. Rows which were filtered are numbered from 0 instead,
+        so tails which were read with `where` are left as they are.
+        """
+        if isinstance(df.index, pd.RangeIndex):
+            df.index = pd.RangeIndex(num_rows - len(df), num_rows)
+        return df
+
+    @staticmethod
+    def _project(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.DataFrame:
+        """
+        Selects the requested `columns` of `df`, in the requested order
+        """
+        if columns is None:
+            return df
+
+        missing_columns = [column for column in columns if column not in df.columns]
+        if missing_columns:
+            raise ColumnNotFoundError(missing_columns)
+        return df[list(columns)]
+
+    @classmethod
+    def sniffed_options(cls, buffer: io.BytesIO) -> Dict[str, Any]:
+        """
+        Returns the loading options which were inferred while sniffing `buffer` (e.g. a CSV's
+        delimiter), so that `stream_to_dataframe` does not need to infer them again
+
+        Args:
+            buffer: A `io.BytesIO` object with the contents of the file
+        """
+        return {}
+
     @staticmethod
     @abc.abstractmethod
     def is_valid_input(buffer: io.BytesIO) -> bool:
@@ -107,4 +277,13 @@ class DataFile(abc.ABC):
     def stream_to_dataframe(stream: io.BytesIO) -> pd.DataFrame:
         """
         Given a `io.BytesIO` object, loads it into a `pd.DataFrame` and returns the new object
+
+        Implementations may accept additional keyword-only loading options:
+            num_lines: The number of lines which are going to be printed, using the same
+                convention as `DataFile.print`. Implementations can use it to avoid
+                loading rows which will not be printed.
+            columns: The names of the columns to load. Implementations can use it to avoid
+                decoding other columns.
+            where: A `Filter` which the loaded rows must match. Implementations which accept
+                it can use it to skip chunks of the file; otherwise, the loaded rows are filtered.
         """
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from pathlib import PurePath
 from typing import Callable
+from typing import Iterable
 from typing import Iterator
+from typing import Optional
 from typing import Tuple
 from typing import TYPE_CHECKING
 from typing import TypeVar
@@ -26,7 +29,7 @@ class filetype:
     A singleton manager class for all file types.
 
     How to register a class with the manager
-    >>> @filetype.register(code='a')
+    >>> @filetype.register(code='a', signatures=(b'AAA1',), extensions=('.a',))
     >>> class AFileType:
     >>>     ...
 
@@ -34,20 +37,77 @@ class filetype:
     class returns tuples of the code and class object
     """
 
+    # Suffixes of compressed files, which are ignored when matching extensions
+    COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz")
+
     def __init__(self) -> None:
         self._types = {}
+        self._signatures = {}
+        self._extensions = {}
+
+    def register(
+        self, *, code: str, signatures: Iterable[bytes] = (), extensions: Iterable[str] = ()
+    ) -> Callable[[_C], _C]:
+        """
+        Args:
+            code: The unique code of the file type
+            signatures: The magic bytes which files of this type start with. File types with
+                signatures are only considered for inputs starting with one of them.
+            extensions: The file name extensions which files of this type usually have
+        """
 
-    def register(self, *, code: str) -> Callable[[_C], _C]:
         def inner(cls: _C) -> _C:
             if code in self.codes:
                 raise DuplicateFileTypeCodeError(cls, code)
 
             logger.debug(f"Collecting the file type `{cls.__name__}` with the code `{code}`")
             self._types[code] = cls
+            self._signatures[code] = tuple(signatures)
+            self._extensions[code] = tuple(extension.lower() for extension in extensions)
             return cls
 
         return inner
 
+    def candidates(self, prefix: bytes, path: Optional[str] = None) -> Iterator[Tuple[str, DataFile]]:
+        """
+        Yields the file types which the input might be, in the order in which they should be checked.
+
+        File types whose signature matches the start of the input come first. The file types
+        without signatures follow, those matching the extension of `path` first, as a fallback
+        for inputs which only happen to start with a signature (e.g. a CSV file whose first
+        column is named "ORC"), so they should only be reached once every matched type
+        rejected the input.
+
+        Args:
+            prefix: The first bytes of the input
+            path: The path of the input, if any
+
+        Returns:
+            An iterator of code and `DataFile` pairs
+        """
+        for code, signatures in self._signatures.items():
+            if any(prefix.startswith(signature) for signature in signatures):
+                logger.debug(f"The input matches the signature of `{code}`")
+                yield code, self._types[code]
+
+        extension = self._get_extension(path)
+        unsigned = [code for code, signatures in self._signatures.items() if not signatures]
+        for code in sorted(unsigned, key=lambda c: extension not in self._extensions[c]):
+            yield code, self._types[code]
+
+    def _get_extension(self, path: Optional[str]) -> Optional[str]:
+        if path is None:
+            return None
+
+        suffixes = [suffix.lower() for suffix in PurePath(path).suffixes]
+        while suffixes and suffixes[-1] in self.COMPRESSION_SUFFIXES:
+            suffixes.pop()
+        return suffixes[-1] if suffixes else None
+
+    @property
+    def max_signature_length(self) -> int:
+        return max((len(s) for signatures in self._signatures.values() for s in signatures), default=0)
+
     def __str__(self) -> str:
         return "\n".join(f"< {code} : {cls.__name__} >" for code, cls in self)
 
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import io
+import posixpath
+import re
+import zipfile
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from xml.etree.ElementTree import Element
+from xml.etree.ElementTree import iterparse
+from xml.etree.ElementTree import XMLParser
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS
+from openpyxl.styles.numbers import is_date_format
+from openpyxl.utils.datetime import from_excel
+from openpyxl.utils.datetime import MAC_EPOCH
+from openpyxl.utils.datetime import WINDOWS_EPOCH
+
+from cat_file.errors import SheetNotFoundError
+from cat_file.logging import logger as __logger
+
+logger = __logger.getChild(__name__)
+
+MAIN_NAMESPACE = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIPS_NAMESPACE = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_RELATIONSHIPS_NAMESPACE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_CELL_REFERENCE = re.compile(r"([A-Z]+)(\d+)")
+_ROW = f"{MAIN_NAMESPACE}row"
+_CELL = f"{MAIN_NAMESPACE}c"
+_VALUE = f"{MAIN_NAMESPACE}v"
+_TEXT = f"{MAIN_NAMESPACE}t"
+_PHONETIC_RUN = f"{MAIN_NAMESPACE}rPh"
+
+# The number of bytes of the XML of a sheet which are parsed at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def column_index(letters: str) -> int:
+    """
+    Returns:
+        The zero based index of the column with the given `letters` (e.g. 0 for "A" and 27 for "AB")
+    """
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def parse_reference(reference: str) -> Tuple[int, int]:
+    """
+    Returns:
+        The zero based row and column indices of a cell `reference` (e.g. (1, 2) for "C2")
+    """
+    match = _CELL_REFERENCE.fullmatch(reference)
+    if match is None:
+        raise ValueError(f"Invalid cell reference {reference}")
+    return int(match.group(2)) - 1, column_index(match.group(1))
+
+
+def string_item_text(element: Element) -> str:
+    """
+    Returns:
+        The text of a string item - a shared string or an inline string. Rich text is split
+        into runs, which are concatenated.
+    """
+    text = element.findtext(f"{MAIN_NAMESPACE}t")
+    if text is not None:
+        return text
+    return "".join(run.findtext(f"{MAIN_NAMESPACE}t") or "" for run in element.iter(f"{MAIN_NAMESPACE}r"))
+
+
+def column_names(header: Dict[int, Any], num_columns: int) -> List[Any]:
+    """
+    Returns:
+        The names which pandas gives the columns of a sheet with the given `header` row -
+        empty cells are named `Unnamed: <index>`, and duplicates get a `.<count>` suffix
+    """
+    names = []
+    counts: Dict[Any, int] = {}
+    for i in range(num_columns):
+        name = header.get(i, f"Unnamed: {i}")
+        if name in counts:
+            counts[name] += 1
+            name = f"{name}.{counts[name]}"
+        else:
+            counts[name] = 0
+        names.append(name)
+    return names
+
+
+class SharedStrings:
+    """
+    The shared strings table of a workbook, which is parsed lazily - only up to the
+    highest index which was looked up so far.
+    """
+
+    def __init__(self, workbook: zipfile.ZipFile, path: Optional[str]) -> None:
+        self._strings: List[str] = []
+        self._elements = self._iter_strings(workbook, path)
+
+    @staticmethod
+    def _iter_strings(workbook: zipfile.ZipFile, path: Optional[str]) -> Iterator[str]:
+        if path is None or path not in workbook.namelist():
+            return
+        with workbook.open(path) as f:
+            for _, element in iterparse(f):
+                if element.tag == f"{MAIN_NAMESPACE}si":
+                    yield string_item_text(element)
+                    element.clear()
+
+    def __getitem__(self, index: int) -> str:
+        while len(self._strings) <= index:
+            string = next(self._elements, None)
+            if string is None:
+                raise IndexError(f"The shared string {index} does not exist")
+            self._strings.append(string)
+        return self._strings[index]
+
+
+class Workbook:
+    """
+    Reads the metadata of an xlsx workbook straight out of its zip archive, without building cell objects
+    """
+
+    def __init__(self, stream: io.BytesIO) -> None:
+        self._zip = zipfile.ZipFile(stream)
+        relationships = self._relationships("xl/workbook.xml")
+        self._sheets: Dict[str, str] = {}
+        self._epoch = WINDOWS_EPOCH
+        with self._zip.open("xl/workbook.xml") as f:
+            for _, element in iterparse(f):
+                if element.tag == f"{MAIN_NAMESPACE}sheet":
+                    relationship_id = element.get(f"{RELATIONSHIPS_NAMESPACE}id")
+                    self._sheets[element.get("name")] = relationships[relationship_id][1]
+                elif element.tag == f"{MAIN_NAMESPACE}workbookPr" and element.get("date1904") in ("1", "true"):
+                    self._epoch = MAC_EPOCH
+
+        targets = {kind.rpartition("/")[2]: target for kind, target in reversed(list(relationships.values()))}
+        self._shared_strings_path = targets.get("sharedStrings")
+        self._styles_path = targets.get("styles")
+        self._shared_strings: Optional[SharedStrings] = None
+        self._date_styles: Optional[Set[str]] = None
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> Workbook:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _relationships(self, part: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Returns:
+            A mapping from the IDs of the relationships of `part` to their types and the paths of their targets
+        """
+        directory, name = posixpath.split(part)
+        path = posixpath.join(directory, "_rels", f"{name}.rels")
+        relationships = {}
+        with self._zip.open(path) as f:
+            for _, element in iterparse(f):
+                if element.tag == f"{PACKAGE_RELATIONSHIPS_NAMESPACE}Relationship":
+                    target = element.get("Target")
+                    # Targets are either absolute within the package, or relative to the part's directory
+                    target = target.lstrip("/") if target.startswith("/") else posixpath.join(directory, target)
+                    relationships[element.get("Id")] = (element.get("Type"), posixpath.normpath(target))
+        return relationships
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self._sheets)
+
+    @property
+    def shared_strings(self) -> SharedStrings:
+        if self._shared_strings is None:
+            self._shared_strings = SharedStrings(self._zip, self._shared_strings_path)
+        return self._shared_strings
+
+    @property
+    def date_styles(self) -> Set[str]:
+        """
+        Returns:
+            The indices (as they appear in the `s` attribute of cells) of the cell styles with date
+            or time number formats
+        """
+        if self._date_styles is None:
+            self._date_styles = set()
+            if self._styles_path is not None and self._styles_path in self._zip.namelist():
+                formats = dict(BUILTIN_FORMATS)
+                with self._zip.open(self._styles_path) as f:
+                    for _, element in iterparse(f):
+                        if element.tag == f"{MAIN_NAMESPACE}numFmt":
+                            formats[int(element.get("numFmtId"))] = element.get("formatCode", "")
+                        elif element.tag == f"{MAIN_NAMESPACE}cellXfs":
+                            for index, xf in enumerate(element.iter(f"{MAIN_NAMESPACE}xf")):
+                                if is_date_format(formats.get(int(xf.get("numFmtId", 0)), "")):
+                                    self._date_styles.add(str(index))
+        return self._date_styles
+
+    def sheet_name(self, sheet: Optional[str] = None) -> str:
+        """
+        Resolves the name of a `sheet`, which is either a sheet name or the index of a sheet
+
+        Args:
+            sheet: The name or the (zero based) index of a sheet, or `None` for the first sheet
+        """
+        names = self.sheet_names
+        if sheet is None:
+            return names[0]
+        if sheet in self._sheets:
+            return sheet
+        if str(sheet).isdigit() and int(sheet) < len(names):
+            return names[int(sheet)]
+        raise SheetNotFoundError(sheet, names)
+
+    def open_sheet(self, sheet: Optional[str] = None) -> io.IOBase:
+        """
+        Returns:
+            A stream of the XML of `sheet`
+        """
+        return self._zip.open(self._sheets[self.sheet_name(sheet)])
+
+    def dimension(self, sheet: Optional[str] = None) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Reads the range of the used cells of `sheet` from the `dimension` element at the top of its XML
+
+        Returns:
+            The zero based (row, column) indices of the first and last cells of the range, or `None`
+            if the sheet does not state its dimension
+        """
+        with self.open_sheet(sheet) as f:
+            for _, element in iterparse(f, events=("start",)):
+                if element.tag == f"{MAIN_NAMESPACE}dimension":
+                    first, _, last = element.get("ref", "").partition(":")
+                    try:
+                        return parse_reference(first), parse_reference(last or first)
+                    except ValueError:
+                        return None
+                if element.tag == f"{MAIN_NAMESPACE}sheetData":
+                    return None
+        return None
+
+    def iter_rows(self, sheet: Optional[str] = None) -> Iterator[Tuple[int, Dict[int, Any]]]:
+        """
+        Iterates over the rows of `sheet`, parsing its XML as it goes. The XML is fed to the parser in chunks,
+        and the parser's callbacks collect the rows without building an element per cell, so the memory which
+        is used does not grow with the size of the sheet.
+
+        Returns:
+            An iterator of zero based row indices and mappings from zero based column indices to cell values
+        """
+        rows = _SheetRows(self)
+        parser = XMLParser(target=rows)
+        with self.open_sheet(sheet) as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                parser.feed(chunk)
+                yield from rows.pop()
+        parser.close()
+        yield from rows.pop()
+
+    def cell_value(self, kind: str, style: Optional[str], value: Optional[str]) -> Any:
+        """
+        Returns:
+            The value of a cell of the type `kind` (the `t` attribute of the cell) and the style `style`
+            (its `s` attribute), which is written as `value` in the sheet
+        """
+        if value is None:
+            return None
+        if kind in ("inlineStr", "str", "e"):
+            return value
+        if kind == "s":
+            return self.shared_strings[int(value)]
+        if kind == "b":
+            return value == "1"
+        number = float(value) if "." in value or "e" in value or "E" in value else int(value)
+        if style in self.date_styles:
+            return from_excel(number, self._epoch)
+        return number
+
+
+class _SheetRows:
+    """
+    A target for `XMLParser`, which collects the rows of a sheet out of the parser's callbacks
+    """
+
+    def __init__(self, workbook: Workbook) -> None:
+        self._workbook = workbook
+        self._rows: List[Tuple[int, Dict[int, Any]]] = []
+        self._row_index = -1
+        self._cells: Dict[int, Any] = {}
+        self._column = -1
+        self._kind = "n"
+        self._style: Optional[str] = None
+        self._text: Optional[List[str]] = None
+        self._value: Optional[List[str]] = None
+        self._in_phonetic_run = False
+        self._column_indices: Dict[str, int] = {}
+
+    def pop(self) -> List[Tuple[int, Dict[int, Any]]]:
+        """
+        Returns:
+            The rows which were parsed since the last call
+        """
+        rows, self._rows = self._rows, []
+        return rows
+
+    def start(self, tag: str, attributes: Dict[str, str]) -> None:
+        if tag == _CELL:
+            reference = attributes.get("r")
+            self._column = self._column_index(reference) if reference else self._column + 1
+            self._kind = attributes.get("t", "n")
+            self._style = attributes.get("s")
+            self._value = None
+        elif tag == _VALUE or (tag == _TEXT and not self._in_phonetic_run):
+            self._text = []
+        elif tag == _PHONETIC_RUN:
+            self._in_phonetic_run = True
+        elif tag == _ROW:
+            reference = attributes.get("r")
+            self._row_index = int(reference) - 1 if reference else self._row_index + 1
+            self._cells = {}
+            self._column = -1
+
+    def data(self, data: str) -> None:
+        if self._text is not None:
+            self._text.append(data)
+
+    def end(self, tag: str) -> None:
+        if self._text is not None and (tag == _VALUE or tag == _TEXT):
+            # The runs of rich text are concatenated
+            self._value = (self._value or []) + self._text
+            self._text = None
+        elif tag == _PHONETIC_RUN:
+            self._in_phonetic_run = False
+        elif tag == _CELL:
+            value = "".join(self._value) if self._value is not None else None
+            value = self._workbook.cell_value(self._kind, self._style, value)
+            if value is not None:
+                self._cells[self._column] = value
+        elif tag == _ROW:
+            self._rows.append((self._row_index, self._cells))
+
+    def close(self) -> None:
+        pass
+
+    def _column_index(self, reference: str) -> int:
+        letters = reference.rstrip("0123456789")
+        index = self._column_indices.get(letters)
+        if index is None:
+            index = self._column_indices[letters] = column_index(letters)
+        return index
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import io
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import pandas as pd
+import pyarrow as pa
+
+from cat_file.filetypes._arrow import as_arrow_input
+from cat_file.filetypes._arrow import count_distinct
+from cat_file.filetypes._arrow import prepare_table
+from cat_file.filetypes._arrow import root_columns
+from cat_file.filetypes._arrow import select_columns
+from cat_file.filetypes._arrow import select_table_columns
+from cat_file.filetypes._base import DataFile
+from cat_file.filetypes._manager import filetype
+from cat_file.filters import Filter
+from cat_file.logging import logger as __logger
+from cat_file.stream import ensure_random_access
+from cat_file.stream import read_prefix
+from cat_file.stream import zero_buffer
+
+logger = __logger.getChild(__name__)
+
+
+@filetype.register(code="a", signatures=(b"ARROW1",), extensions=(".arrow", ".feather", ".ipc"))
+class Arrow(DataFile):
+    """
+    Arrow IPC files (which Feather V2 files are). The record batches of random access inputs, e.g. memory-mapped
+    files, point into the input instead of being copied (unless their buffers are compressed, in which case only
+    the batches which are read are decompressed), so only the rows which are converted to pandas are copied.
+    """
+
+    @staticmethod
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Filter] = None,
+        flatten: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            flatten: Whether to replace struct columns with a column per (nested) field, named by
+                its dotted path
+        """
+        columns = list(columns) if columns is not None else None
+        reader = Arrow._open(stream)
+        if num_lines is None:
+            table = Arrow._prepare(reader.read_all(), columns, where, flatten)
+        else:
+            table = Arrow._read_batches(reader, num_lines, columns, where, flatten)
+        df = select_table_columns(table, columns).to_pandas()
+        if num_lines is not None and num_lines < 0 and where is None:
+            # The rows keep their positions in the file, which the lengths of the record batches tell
+            df = Arrow._number_tail(df, reader.count_rows())
+        return df
+
+    @staticmethod
+    def _read_batches(
+        reader: pa.ipc.RecordBatchFileReader,
+        num_lines: int,
+        columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Reads the first `num_lines` rows (which match `where`), or the last ones if `num_lines` is negative,
+        going over the record batches from the start (or the end) of the file until there are enough rows
+        """
+        from_end = num_lines < 0
+        num_lines = abs(num_lines)
+        batch_indices = range(reader.num_record_batches)
+        tables = []
+        num_rows = 0
+        for i in reversed(batch_indices) if from_end else batch_indices:
+            if num_rows >= num_lines:
+                break
+            table = Arrow._prepare(pa.Table.from_batches([reader.get_batch(i)]), columns, where, flatten)
+            tables.append(table)
+            num_rows += table.num_rows
+        logger.debug(f"Read {len(tables)} record batches with {num_rows} rows for {num_lines} rows")
+
+        if from_end:
+            tables.reverse()
+        if not tables:
+            tables = [Arrow._prepare(reader.schema.empty_table(), columns, where, flatten)]
+        table = pa.concat_tables(tables)
+        return table.slice(max(table.num_rows - num_lines, 0)) if from_end else table.slice(0, num_lines)
+
+    @staticmethod
+    def _prepare(table: pa.Table, columns: Optional[List[str]], where: Optional[Filter], flatten: bool) -> pa.Table:
+        """
+        Selects the columns of `table` which are needed (which does not copy them), flattens it if needed,
+        and selects the rows of it which match `where`
+        """
+        read_columns = root_columns(table.schema, columns, where, flatten)
+        if read_columns is not None:
+            table = table.select(read_columns)
+        return prepare_table(table, where, flatten)
+
+    @staticmethod
+    def _open(stream: io.BytesIO) -> pa.ipc.RecordBatchFileReader:
+        return pa.ipc.open_file(as_arrow_input(stream))
+
+    @classmethod
+    def describe_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        """
+        Describes the file from its record batches, without converting them to pandas. The row and null
+        counts are stored in the metadata of the batches, and only the unique value counts read the data.
+        """
+        with zero_buffer(buffer) as b:
+            reader = cls._open(ensure_random_access(b))
+            names = select_columns(reader.schema, columns)
+            table = reader.read_all().select(names)
+
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(table.schema.field(name).type) for name in names]
+            output["Null Count"] = [table.column(name).null_count for name in names]
+            output["# Unique"] = [count_distinct(table.column(name)) for name in names]
+            cls._print_description(table.num_rows, output)
+        return True
+
+    @classmethod
+    def schema_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        with zero_buffer(buffer) as b:
+            schema = cls._open(ensure_random_access(b)).schema
+            names = select_columns(schema, columns)
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(schema.field(name).type) for name in names]
+            output["Nullable"] = [schema.field(name).nullable for name in names]
+            cls._print_schema(output)
+        return True
+
+    @staticmethod
+    def is_valid_input(buffer: io.BytesIO) -> bool:
+        return read_prefix(buffer, 6) == b"ARROW1"
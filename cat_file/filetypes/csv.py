@@ -2,30 +2,303 @@ from __future__ import annotations
 
 import csv
 import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from weakref import WeakKeyDictionary
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
+from cat_file.filetypes._arrow import as_arrow_input
+from cat_file.filetypes._arrow import BLOCK_SIZE
+from cat_file.filetypes._arrow import MAX_BLOCK_SIZE
+from cat_file.filetypes._arrow import table_to_dataframe
 from cat_file.filetypes._base import DataFile
 from cat_file.filetypes._manager import filetype
 from cat_file.logging import logger as __logger
-from cat_file.stream import zero_buffer
+from cat_file.stream import count_records
+from cat_file.stream import get_buffer
+from cat_file.stream import get_size
+from cat_file.stream import is_random_access
+from cat_file.stream import iter_record_starts_reversed
+from cat_file.stream import iter_records
+from cat_file.stream import PEEK_SIZE
+from cat_file.stream import read_prefix
+from cat_file.stream import read_text_sample
+from cat_file.stream import split_records
 
 logger = __logger.getChild(__name__)
 
+# The results of sniffing each buffer, so that the parser can reuse them
+_sniffed_dialects: WeakKeyDictionary = WeakKeyDictionary()
 
-@filetype.register(code="c")
+
+@filetype.register(code="c", extensions=(".csv", ".tsv", ".txt"))
 class CSV(DataFile):
+    requires_random_access = False
+
+    # The delimiters which the sniffer may choose from
+    DELIMITERS = ",\t;|"
+    # The input size from which the multithreaded pyarrow engine is used for full loads
+    ARROW_ENGINE_MIN_SIZE = 32 * 1024 * 1024
+    # The input size from which random access inputs are split into ranges which are parsed in parallel
+    PARALLEL_ENGINE_MIN_SIZE = 256 * 1024 * 1024
+
     @staticmethod
-    def stream_to_dataframe(stream: io.BytesIO) -> pd.DataFrame:
-        return pd.read_csv(stream)
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        delimiter: str = ",",
+        quotechar: str = '"',
+        has_header: bool = True,
+        engine: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            engine: The engine to fully load the data with - "pandas", "pyarrow" or "parallel".
+                By default, the input is split into ranges which are parsed in parallel for very large
+                random access inputs, pyarrow is used for large inputs, and pandas, which is faster
+                to set up, otherwise
+        """
+        options = {
+            "sep": delimiter,
+            "quotechar": quotechar,
+            "header": 0 if has_header else None,
+            "usecols": list(columns) if columns is not None else None,
+        }
+        if num_lines is not None and num_lines >= 0:
+            # The parser consumes the stream incrementally, so it stops reading once it has enough rows
+            return pd.read_csv(stream, nrows=num_lines, **options)
+        if num_lines is not None and is_random_access(stream):
+            return CSV._read_tail(stream, abs(num_lines), options)
+        if num_lines is not None:
+            return CSV._read_streamed_tail(stream, abs(num_lines), options)
+
+        engine = engine or CSV._select_engine(stream)
+        if engine == "parallel":
+            return CSV._read_parallel(stream, options)
+        if engine == "pyarrow":
+            return CSV._read_arrow(stream, options)
+        return pd.read_csv(stream, **options)
 
     @staticmethod
-    def is_valid_input(buffer: io.BytesIO) -> bool:
+    def _select_engine(stream: io.BytesIO) -> str:
+        size = get_size(stream)
+        if size is None:
+            # The size of a piped input is unknown, so it is considered large if it overflows the peekable prefix
+            is_large = stream.seekable() and len(read_prefix(stream, PEEK_SIZE)) == PEEK_SIZE
+        else:
+            is_large = size >= CSV.ARROW_ENGINE_MIN_SIZE
+
+        if is_large and size is not None and size >= CSV.PARALLEL_ENGINE_MIN_SIZE and (os.cpu_count() or 1) > 1:
+            engine = "parallel"
+        else:
+            engine = "pyarrow" if is_large else "pandas"
+        logger.debug(f"Selected the {engine} engine")
+        return engine
+
+    @staticmethod
+    def _read_arrow(stream: io.BytesIO, options: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Fully loads `stream` with pyarrow's multithreaded CSV parser
+        """
+        has_header = options["header"] is not None
+        table = pacsv.read_csv(
+            as_arrow_input(stream),
+            read_options=pacsv.ReadOptions(
+                use_threads=True, block_size=BLOCK_SIZE, autogenerate_column_names=not has_header
+            ),
+            parse_options=CSV._arrow_parse_options(options),
+            convert_options=CSV._arrow_convert_options(stream, options),
+        )
+        return CSV._table_to_dataframe(table, has_header)
+
+    @staticmethod
+    def _read_parallel(stream: io.BytesIO, options: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Fully loads a random access `stream` by splitting it into byte ranges, aligned to its
+        records, which are parsed concurrently and then concatenated in order
+        """
+        view = get_buffer(stream)
+        if view is None:
+            return CSV._read_arrow(stream, options)
+
+        num_workers = os.cpu_count() or 1
+        # Each range is parsed as a single block, so that its types are inferred from all of its rows
+        num_ranges = max(num_workers, -(-len(view) // MAX_BLOCK_SIZE))
+        ranges = split_records(view, num_ranges, quotechar=options["quotechar"].encode(), max_workers=num_workers)
+        logger.debug(f"Parsing {len(ranges)} ranges in parallel")
+
+        has_header = options["header"] is not None
+        parse_options = CSV._arrow_parse_options(options)
+        convert_options = CSV._arrow_convert_options(stream, options)
+        # The ranges after the first one have no header, so they are parsed with its column names
+        stream.seek(0)
+        column_names = list(pd.read_csv(stream, nrows=0, **{**options, "usecols": None}).columns)
+        if not has_header:
+            column_names = [f"f{i}" for i in range(len(column_names))]
+
+        def parse(i: int) -> pa.Table:
+            start, end = ranges[i]
+            read_options = pacsv.ReadOptions(
+                use_threads=False,
+                block_size=min(max(BLOCK_SIZE, end - start), MAX_BLOCK_SIZE),
+                column_names=column_names if i > 0 or not has_header else None,
+            )
+            source = pa.BufferReader(pa.py_buffer(view[start:end]))
+            return pacsv.read_csv(
+                source, read_options=read_options, parse_options=parse_options, convert_options=convert_options
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                tables = list(executor.map(parse, range(len(ranges))))
+            table = pa.concat_tables(tables, promote_options="permissive")
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            logger.debug("The types of the ranges could not be unified, parsing the input as a whole")
+            stream.seek(0)
+            return CSV._read_arrow(stream, options)
+        return CSV._table_to_dataframe(table, has_header)
+
+    @staticmethod
+    def _arrow_parse_options(options: Dict[str, Any]) -> pacsv.ParseOptions:
+        return pacsv.ParseOptions(delimiter=options["sep"], quote_char=options["quotechar"], newlines_in_values=True)
+
+    @staticmethod
+    def _arrow_convert_options(stream: io.BytesIO, options: Dict[str, Any]) -> pacsv.ConvertOptions:
+        """
+        Returns the options to convert the columns of `stream` with. Columns which are not included are
+        never converted, and, like pandas, dates and times are kept as strings: pyarrow can't be told not
+        to infer them, so the columns which it infers as temporal from a sample of the records are read
+        as strings.
+        """
+        has_header = options["header"] is not None
+        records = read_text_sample(stream, quotechar=options["quotechar"].encode()) or []
         try:
-            sniffer = csv.Sniffer()
-            with zero_buffer(buffer) as b:
-                sample = b.read().decode()
-                sniffer.sniff(sample)
-                return sniffer.has_header(sample)
-        except csv.Error:
+            sample = pacsv.read_csv(
+                io.BytesIO("".join(records).encode()),
+                read_options=pacsv.ReadOptions(autogenerate_column_names=not has_header),
+                parse_options=CSV._arrow_parse_options(options),
+            )
+            column_types = {f.name: pa.string() for f in sample.schema if pa.types.is_temporal(f.type)}
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            column_types = {}
+        # Like pandas, empty and NA-like cells are nulls in text columns too, whether they are quoted or not
+        return pacsv.ConvertOptions(
+            include_columns=options["usecols"],
+            column_types=column_types,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        )
+
+    @staticmethod
+    def _pandas_type(arrow_type: pa.DataType) -> pa.DataType:
+        """
+        Returns:
+            The type pandas would parse a column which pyarrow inferred as `arrow_type` as: empty columns are
+            floats, and dates and times (which were not in the sample the types were inferred from) are strings
+        """
+        if pa.types.is_null(arrow_type):
+            return pa.float64()
+        return pa.string() if pa.types.is_temporal(arrow_type) else arrow_type
+
+    @staticmethod
+    def _table_to_dataframe(table: pa.Table, has_header: bool) -> pd.DataFrame:
+        schema = pa.schema([f.with_type(CSV._pandas_type(f.type)) for f in table.schema])
+        df = table_to_dataframe(table.cast(schema))
+        if not has_header:
+            df.columns = range(df.shape[1])
+        return df
+
+    @staticmethod
+    def _read_streamed_tail(stream: io.BytesIO, num_lines: int, options: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Reads only the header and the last `num_lines` records of a forward-only `stream`,
+        holding no more than `num_lines` raw records in memory at a time
+        """
+        records = iter_records(stream, quotechar=options["quotechar"].encode())
+        header = next(records, b"") if options["header"] is not None else b""
+        tail: deque = deque(maxlen=num_lines)
+        num_records = 0
+        for num_records, record in enumerate(records, 1):
+            tail.append(record)
+        df = pd.read_csv(io.BytesIO(b"".join([header, *tail])), **options)
+        return CSV._number_tail(df, num_records - len(tail) + len(df))
+
+    @staticmethod
+    def _read_tail(stream: io.BytesIO, num_lines: int, options: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Reads only the header and the last `num_lines` records of a random access `stream`
+        """
+        # One more record than needed is looked for, so that the header is never part of the tail
+        quotechar = options["quotechar"].encode()
+        record_starts = list(islice(iter_record_starts_reversed(stream, quotechar=quotechar), num_lines + 1))
+        stream.seek(0)
+        if len(record_starts) <= num_lines:
+            logger.debug("The file has no more records than requested, reading all of it")
+            return pd.read_csv(stream, **options)
+
+        names = pd.read_csv(stream, nrows=0, **{**options, "usecols": None}).columns
+        tail_start = record_starts[num_lines - 1]
+        stream.seek(tail_start)
+        tail = stream.read()
+        logger.debug(f"Parsing the last {len(tail):,} bytes of the file")
+        df = pd.read_csv(io.BytesIO(tail), **{**options, "header": None, "names": list(names)})
+        # The rows keep their positions in the file, which the records before the tail tell
+        num_rows_before = count_records(stream, tail_start, quotechar) - (options["header"] is not None)
+        return CSV._number_tail(df, num_rows_before + len(df))
+
+    @staticmethod
+    def _sniff(buffer: io.BytesIO) -> Optional[Dict[str, Any]]:
+        """
+        Sniffs the dialect of a bounded sample of `buffer`.
+        The result is cached per buffer, so that it is only computed once.
+
+        Returns:
+            The `delimiter`, `quotechar` and `has_header` options of the data, or `None` if
+            the data does not seem to be a CSV
+        """
+        if buffer in _sniffed_dialects:
+            return _sniffed_dialects[buffer]
+
+        result = None
+        records = read_text_sample(buffer, quotechar=b'"')
+        if records:
+            sample = "".join(records)
+            try:
+                sniffer = csv.Sniffer()
+                dialect = sniffer.sniff(sample, delimiters=CSV.DELIMITERS)
+                result = {
+                    "delimiter": dialect.delimiter,
+                    "quotechar": dialect.quotechar or '"',
+                    "has_header": sniffer.has_header(sample),
+                }
+                logger.debug(f"Sniffed the CSV dialect: {result}")
+            except csv.Error:
+                pass
+
+        _sniffed_dialects[buffer] = result
+        return result
+
+    @classmethod
+    def sniffed_options(cls, buffer: io.BytesIO) -> Dict[str, Any]:
+        return cls._sniff(buffer) or {}
+
+    @staticmethod
+    def is_valid_input(buffer: io.BytesIO) -> bool:
+        sniffed = CSV._sniff(buffer)
+        if sniffed is None or not sniffed["has_header"]:
             return False
+
+        # The sniffer finds a "header" in JSON objects with nested objects too
+        header = read_text_sample(buffer, quotechar=b'"')[0].strip()
+        return not (header.startswith("{") and header.endswith("}"))
@@ -1,27 +1,323 @@
 from __future__ import annotations
 
 import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
 from zipfile import BadZipfile
 
 import pandas as pd
 from pandas.io.excel._base import inspect_excel_format
+from tabulate import tabulate
 
+from cat_file.errors import ColumnNotFoundError
 from cat_file.filetypes._base import DataFile
 from cat_file.filetypes._manager import filetype
+from cat_file.filetypes._xlsx import column_names
+from cat_file.filetypes._xlsx import Workbook
 from cat_file.logging import logger as __logger
+from cat_file.stream import ensure_random_access
+from cat_file.stream import get_buffer
+from cat_file.stream import get_size
+from cat_file.stream import is_random_access
+from cat_file.stream import PEEK_SIZE
+from cat_file.stream import PeekableStream
+from cat_file.stream import read_prefix
 from cat_file.stream import zero_buffer
 
 logger = __logger.getChild(__name__)
 
+# The workbook which is loaded by a worker process of `Excel.sheets_from_bytes_stream`
+_workbook: Optional[bytes] = None
 
-@filetype.register(code="xl")
+
+def _set_workbook(workbook: bytes) -> None:
+    global _workbook
+    _workbook = workbook
+
+
+def _load_sheet(sheet: str, options: Dict[str, Any]) -> pd.DataFrame:
+    return Excel.from_bytes_stream(io.BytesIO(_workbook), sheet=sheet, **options).contents
+
+
+@filetype.register(
+    code="xl",
+    signatures=(b"PK\x03\x04", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),
+    extensions=(".xlsx", ".xlsm", ".xls"),
+)
 class Excel(DataFile):
+    # The size from which xlsx workbooks are loaded with the native engine by default
+    NATIVE_ENGINE_MIN_SIZE = 16 * 1024 * 1024
+    # The number of rows which the native engine collects before converting them to columns
+    NATIVE_BATCH_SIZE = 64 * 1024
+
     @staticmethod
-    def stream_to_dataframe(stream: io.BytesIO) -> pd.DataFrame:
-        return pd.read_excel(stream)
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        sheet: Optional[str] = None,
+        engine: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            sheet: The name or the (zero based) index of the sheet to load. Defaults to the first sheet
+            engine: The engine to load xlsx workbooks with - "openpyxl" or "native". By default,
+                the native engine is used for xlsx workbooks of at least `NATIVE_ENGINE_MIN_SIZE` bytes.
+                Other workbooks are loaded by pandas, whichever engine is given.
+        """
+        if Excel._is_xlsx(stream) and (engine or Excel._select_engine(stream)) == "native":
+            return Excel._read_native(stream, num_lines, columns, sheet)
+
+        sheet_name = Excel._sheet_name(stream, sheet)
+        # pandas reads xlsx workbooks in read-only mode, so it stops parsing the sheet after `nrows` rows
+        nrows = num_lines if num_lines is not None and num_lines >= 0 else None
+        return pd.read_excel(
+            stream,
+            sheet_name=sheet_name,
+            nrows=nrows,
+            # Missing columns are left out instead of failing, so that they are reported as a `ColumnNotFoundError`
+            usecols=(lambda name: name in columns) if columns is not None else None,
+        )
+
+    @staticmethod
+    def _select_engine(stream: io.BytesIO) -> str:
+        size = get_size(stream)
+        engine = "native" if size is not None and size >= Excel.NATIVE_ENGINE_MIN_SIZE else "openpyxl"
+        logger.debug(f"Selected the {engine} engine")
+        return engine
+
+    @staticmethod
+    def _read_native(
+        stream: io.BytesIO, num_lines: Optional[int], columns: Optional[Sequence[str]], sheet: Optional[str]
+    ) -> pd.DataFrame:
+        """
+        Loads a sheet of an xlsx workbook by parsing its XML straight out of the zip archive, instead of
+        building an openpyxl cell object per cell. The rows are collected in batches of `NATIVE_BATCH_SIZE`,
+        which are converted to columns as they fill up, and the rows are dropped from the parsed XML once
+        they were read. The result follows `pd.read_excel` - the first row is the header, blank rows in the
+        middle of the sheet are kept and blank rows at its end are not.
+        """
+        head = num_lines if num_lines is not None and num_lines >= 0 else None
+        tail = -num_lines if num_lines is not None and num_lines < 0 else None
+
+        with zero_buffer(stream) as b, Workbook(b) as workbook:
+            rows = workbook.iter_rows(sheet)
+            # Blank rows before the header are skipped
+            header_index, header = next(((index, cells) for index, cells in rows if cells), (0, {}))
+            header_names = column_names(header, max(header, default=-1) + 1)
+            indices = None
+            if columns is not None and all(column in header_names for column in columns):
+                indices = [header_names.index(column) for column in columns]
+
+            batches: List[pd.DataFrame] = []
+            batch: Union[List[Dict[int, Any]], deque] = deque(maxlen=tail) if tail is not None else []
+            num_columns = len(header_names)
+            num_rows = 0
+            for cells in Excel._fill_blank_rows(rows, header_index, head):
+                batch.append(cells)
+                num_rows += 1
+                num_columns = max(num_columns, max(cells, default=-1) + 1)
+                if tail is None and len(batch) >= Excel.NATIVE_BATCH_SIZE:
+                    batches.append(Excel._rows_to_dataframe(batch, indices))
+                    batch = []
+            batches.append(Excel._rows_to_dataframe(list(batch), indices))
+
+        df = pd.concat(batches, ignore_index=True)
+        if tail is not None:
+            # The rows keep their positions in the sheet
+            df = Excel._number_tail(df, num_rows)
+        if indices is not None:
+            df.columns = list(columns)
+        else:
+            df = df.reindex(columns=range(num_columns))
+            df.columns = column_names(header, num_columns)
+            if columns is not None:
+                missing_columns = [column for column in columns if column not in df.columns]
+                if missing_columns:
+                    raise ColumnNotFoundError(missing_columns)
+                df = df[list(columns)]
+        # Columns which only had nulls in some of the batches were converted to objects
+        df = df.infer_objects()
+        for column in df.columns[df.dtypes == object]:
+            values = df[column].dropna()
+            if len(values) < len(df) and values.map(type).eq(bool).all():
+                # Like pandas, which converts booleans to floats when there are nulls among them
+                df[column] = df[column].astype(float)
+        return df
+
+    @staticmethod
+    def _fill_blank_rows(
+        rows: Iterator[Tuple[int, Dict[int, Any]]], header_index: int, num_lines: Optional[int]
+    ) -> Iterator[Dict[int, Any]]:
+        """
+        Adds the blank rows which are left out of the XML of a sheet to its `rows`, unless they are
+        at the end of the sheet (or of its first `num_lines` rows)
+
+        Args:
+            rows: The rows of the sheet which follow its header
+            header_index: The index of the header row
+            num_lines: The number of rows after the header to read, or `None` to read all of them
+        """
+        previous_index = header_index
+        num_blank_rows = 0
+        for row_index, cells in rows:
+            if num_lines is not None and row_index - header_index > num_lines:
+                return
+            num_blank_rows += row_index - previous_index - 1
+            previous_index = row_index
+            if not cells:
+                num_blank_rows += 1
+                continue
+            for _ in range(num_blank_rows):
+                yield {}
+            num_blank_rows = 0
+            yield cells
+
+    @staticmethod
+    def _rows_to_dataframe(rows: List[Dict[int, Any]], indices: Optional[List[int]]) -> pd.DataFrame:
+        if indices is None:
+            indices = sorted({index for cells in rows for index in cells})
+        return pd.DataFrame({index: [cells.get(index) for cells in rows] for index in indices}, index=range(len(rows)))
+
+    @staticmethod
+    def _is_xlsx(stream: io.BytesIO) -> bool:
+        # Other workbooks are zip archives too, such as ods and xlsb ones, so the archive has to hold an xlsx workbook
+        if read_prefix(stream, 4) != b"PK\x03\x04":
+            return False
+        with zero_buffer(stream) as b:
+            try:
+                return inspect_excel_format(b) == "xlsx"
+            except BadZipfile:
+                return False
+
+    @staticmethod
+    def _sheet_name(stream: io.BytesIO, sheet: Optional[str]) -> Union[str, int]:
+        """
+        Returns:
+            The name of `sheet` in an xlsx workbook, or `sheet` as pandas expects it for other workbooks
+        """
+        if sheet is None:
+            return 0
+        if not Excel._is_xlsx(stream):
+            return int(sheet) if str(sheet).isdigit() else sheet
+
+        with zero_buffer(stream) as b, Workbook(b) as workbook:
+            return workbook.sheet_name(sheet)
+
+    @staticmethod
+    def _sheet_names(stream: io.BytesIO) -> List[str]:
+        if not Excel._is_xlsx(stream):
+            return pd.ExcelFile(stream).sheet_names
+        with zero_buffer(stream) as b, Workbook(b) as workbook:
+            return workbook.sheet_names
+
+    @classmethod
+    def sheets_from_bytes_stream(cls, buffer: io.BytesIO, **options: Any) -> Iterator[Tuple[str, DataFile]]:
+        """
+        Loads every sheet of the workbook. Parsing a sheet holds the GIL, so the sheets are loaded in a pool
+        of processes, which get a copy of the workbook when they start. The sheets are yielded in order,
+        each as soon as it was loaded.
+        """
+        with zero_buffer(buffer) as b:
+            b = ensure_random_access(b)
+            view = get_buffer(b)
+            workbook = bytes(view) if view is not None else b.read()
+
+        sheet_names = cls._sheet_names(io.BytesIO(workbook))
+        num_workers = min(os.cpu_count() or 1, len(sheet_names))
+        if num_workers < 2:
+            logger.debug("Loading the sheets one after the other")
+            return ((name, cls.from_bytes_stream(io.BytesIO(workbook), sheet=name, **options)) for name in sheet_names)
+        return cls._load_sheets_in_processes(workbook, sheet_names, options, num_workers)
+
+    @classmethod
+    def _load_sheets_in_processes(
+        cls, workbook: bytes, sheet_names: List[str], options: Dict[str, Any], num_workers: int
+    ) -> Iterator[Tuple[str, DataFile]]:
+        logger.debug(f"Loading {len(sheet_names)} sheets in {num_workers} processes")
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_set_workbook, initargs=(workbook,)) as executor:
+            futures = [executor.submit(_load_sheet, name, options) for name in sheet_names]
+            try:
+                for name, future in zip(sheet_names, futures):
+                    yield name, cls(future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    @classmethod
+    def list_sheets_stream(cls, buffer: io.BytesIO) -> bool:
+        with zero_buffer(buffer) as b:
+            b = ensure_random_access(b)
+            if not cls._is_xlsx(b):
+                output = pd.DataFrame({"Sheet": pd.ExcelFile(b).sheet_names})
+            else:
+                with Workbook(b) as workbook:
+                    output = pd.DataFrame({"Sheet": workbook.sheet_names})
+                    dimensions = [workbook.dimension(name) or (None, None) for name in workbook.sheet_names]
+                # The first row of a sheet is its header
+                output["# Rows"] = [last[0] - first[0] if first else None for first, last in dimensions]
+                output["# Columns"] = [last[1] - first[1] + 1 if first else None for first, last in dimensions]
+
+        output.index.name = "Index"
+        print("~" * 100, end="\n\n")
+        print(tabulate(output, headers="keys", tablefmt="grid", stralign="center", numalign="center", missingval="?"))
+        return True
+
+    @classmethod
+    def describe_stream(
+        cls,
+        buffer: io.BytesIO,
+        columns: Optional[Sequence[str]] = None,
+        sheet: Optional[str] = None,
+        metadata_only: bool = False,
+        **options: Any,
+    ) -> bool:
+        """
+        When `metadata_only` is set, describes an xlsx sheet from the dimension stated at the top of its XML
+        and its header row, without parsing the rest of its cells. The counts of nulls and unique values need
+        the cells, so they are left out, and the number of rows includes blank rows which are formatted.
+        Otherwise, the sheet has to be loaded in order to describe it.
+        """
+        if not metadata_only or not is_random_access(buffer) or not cls._is_xlsx(buffer):
+            return False
+
+        with zero_buffer(buffer) as b, Workbook(b) as workbook:
+            dimension = workbook.dimension(sheet)
+            if dimension is None or dimension[0] != (0, 0):
+                logger.debug("The sheet does not state a dimension which starts at A1, so it has to be loaded")
+                return False
+            (_, _), (last_row, last_column) = dimension
+            _, header = next(workbook.iter_rows(sheet), (0, {}))
+
+        names = column_names(header, last_column + 1)
+        if columns is not None:
+            missing_columns = [column for column in columns if column not in names]
+            if missing_columns:
+                raise ColumnNotFoundError(missing_columns)
+            names = list(columns)
+        cls._print_description(last_row, pd.DataFrame(index=pd.Index(names, name="Columns")))
+        return True
 
     @staticmethod
     def is_valid_input(buffer: io.BytesIO) -> bool:
+        if isinstance(buffer, PeekableStream):
+            # The zip directory is at the end of the file, so only the local file headers
+            # found in the prefix of a piped input can be checked
+            sample = read_prefix(buffer, PEEK_SIZE)
+            if sample.startswith(b"PK\x03\x04"):
+                return b"xl/" in sample
+            buffer = io.BytesIO(sample)
+
         with zero_buffer(buffer) as b:
             try:
                 return inspect_excel_format(b) is not None
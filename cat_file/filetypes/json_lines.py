@@ -2,31 +2,249 @@ from __future__ import annotations
 
 import io
 import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pajson
 
+from cat_file.filetypes._arrow import as_arrow_input
+from cat_file.filetypes._arrow import BLOCK_SIZE
+from cat_file.filetypes._arrow import flatten_structs
+from cat_file.filetypes._arrow import MAX_BLOCK_SIZE
+from cat_file.filetypes._arrow import table_to_dataframe
 from cat_file.filetypes._base import DataFile
 from cat_file.filetypes._manager import filetype
 from cat_file.logging import logger as __logger
-from cat_file.stream import zero_buffer
+from cat_file.stream import count_records
+from cat_file.stream import ensure_random_access
+from cat_file.stream import get_buffer
+from cat_file.stream import get_size
+from cat_file.stream import is_random_access
+from cat_file.stream import iter_record_starts_reversed
+from cat_file.stream import iter_records
+from cat_file.stream import read_text_sample
+from cat_file.stream import split_records
 
 logger = __logger.getChild(__name__)
 
 
-@filetype.register(code="jl")
+@filetype.register(code="jl", extensions=(".jsonl", ".ndjson", ".json"))
 class JSON_Lines(DataFile):
+    requires_random_access = False
+
+    # The input size from which random access inputs are split into chunks which are parsed in parallel
+    PARALLEL_ENGINE_MIN_SIZE = 256 * 1024 * 1024
+
+    @staticmethod
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        engine: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        flatten: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            engine: The engine to fully load the data with - "pyarrow" or "parallel". By default,
+                very large random access inputs are split into chunks which are parsed in parallel
+            flatten: Whether to replace nested objects with a column per (nested) key, named by its dotted path
+        """
+        if num_lines is None:
+            stream = ensure_random_access(stream)
+            if (engine or JSON_Lines._select_engine(stream)) == "parallel":
+                return JSON_Lines._read_parallel(stream, columns, flatten)
+            return JSON_Lines._read_arrow(stream, columns, flatten)
+
+        num_records_before = 0
+        if num_lines < 0 and is_random_access(stream):
+            record_starts = list(islice(iter_record_starts_reversed(stream), abs(num_lines)))
+            # The first record's start is never reported, so fewer offsets mean the whole file is needed
+            tail_start = record_starts[-1] if len(record_starts) == abs(num_lines) else 0
+            num_records_before = count_records(stream, tail_start)
+            stream.seek(tail_start)
+
+        rows = iter_records(stream)
+        if num_lines >= 0:
+            return JSON_Lines._records_to_dataframe(islice(rows, num_lines), columns, flatten)
+
+        # Only the last records are kept, so memory is bounded by the number of lines to print
+        tail: deque = deque(maxlen=abs(num_lines))
+        num_records = num_records_before
+        for num_records, row in enumerate(rows, num_records_before + 1):
+            tail.append(row)
+        df = JSON_Lines._records_to_dataframe(tail, columns, flatten)
+        # The rows keep their positions in the file
+        return JSON_Lines._number_tail(df, num_records - len(tail) + len(df))
+
+    @staticmethod
+    def _records_to_dataframe(
+        rows: Iterable[bytes], columns: Optional[Sequence[str]] = None, flatten: bool = False
+    ) -> pd.DataFrame:
+        return JSON_Lines._read_arrow(io.BytesIO(b"\n".join(row.rstrip(b"\r\n") for row in rows)), columns, flatten)
+
+    @staticmethod
+    def _select_engine(stream: io.BytesIO) -> str:
+        size = get_size(stream)
+        is_very_large = size is not None and size >= JSON_Lines.PARALLEL_ENGINE_MIN_SIZE
+        engine = "parallel" if is_very_large and (os.cpu_count() or 1) > 1 else "pyarrow"
+        logger.debug(f"Selected the {engine} engine")
+        return engine
+
+    @staticmethod
+    def _read_parallel(
+        stream: io.BytesIO, columns: Optional[Sequence[str]] = None, flatten: bool = False
+    ) -> pd.DataFrame:
+        """
+        Fully loads a random access `stream` by splitting it at newlines into a chunk per core.
+        The chunks are parsed concurrently (pyarrow releases the GIL while parsing) with the
+        schema inferred from a sample, and their tables are unified and concatenated in order.
+        """
+        view = get_buffer(stream)
+        if view is None:
+            return JSON_Lines._read_arrow(stream, columns, flatten)
+
+        num_workers = os.cpu_count() or 1
+        # Without a quote character, each chunk simply ends at the first newline after its bound
+        num_chunks = max(num_workers, -(-len(view) // MAX_BLOCK_SIZE))
+        chunks = split_records(view, num_chunks, max_workers=num_workers)
+        logger.debug(f"Parsing {len(chunks)} chunks in parallel")
+        parse_options = JSON_Lines._parse_options(stream, columns, flatten)[0]
+
+        def parse(start: int, end: int) -> pa.Table:
+            source = pa.BufferReader(pa.py_buffer(view[start:end]))
+            read_options = pajson.ReadOptions(
+                use_threads=False, block_size=min(max(BLOCK_SIZE, end - start), MAX_BLOCK_SIZE)
+            )
+            return pajson.read_json(source, read_options=read_options, parse_options=parse_options)
+
+        try:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                tables = list(executor.map(lambda chunk: parse(*chunk), chunks))
+            table = pa.concat_tables(tables, promote_options="permissive")
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+            logger.debug(f"The chunks could not be parsed into a single schema, parsing the input as a whole: {e}")
+            return JSON_Lines._read_arrow(stream, columns, flatten)
+        return table_to_dataframe(JSON_Lines._select(table, columns, flatten))
+
+    @staticmethod
+    def _read_arrow(stream: io.BytesIO, columns: Optional[Sequence[str]] = None, flatten: bool = False) -> pd.DataFrame:
+        """
+        Loads a random access `stream` with pyarrow's block-wise, multithreaded JSON parser.
+        The schema is inferred from a sample of the records and then imposed on the rest of them,
+        and nested objects are kept as struct columns.
+
+        Records which pyarrow cannot parse into a single schema (e.g. a field with mixed types)
+        are parsed one by one instead.
+        """
+        for parse_options in JSON_Lines._parse_options(stream, columns, flatten):
+            stream.seek(0)
+            try:
+                table = pajson.read_json(
+                    as_arrow_input(stream),
+                    read_options=pajson.ReadOptions(use_threads=True, block_size=BLOCK_SIZE),
+                    parse_options=parse_options,
+                )
+                return table_to_dataframe(JSON_Lines._select(table, columns, flatten))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                logger.debug(f"pyarrow could not parse the records with {parse_options.explicit_schema=}: {e}")
+
+        stream.seek(0)
+        records = (json.loads(row) for row in iter_records(stream))
+        if flatten:
+            df = pd.json_normalize(list(records))
+            return df[[column for column in columns if column in df.columns]] if columns is not None else df
+        if columns is not None:
+            records = ({key: record[key] for key in columns if key in record} for record in records)
+        return pd.DataFrame.from_records(records)
+
+    @staticmethod
+    def _parse_options(
+        stream: io.BytesIO, columns: Optional[Sequence[str]] = None, flatten: bool = False
+    ) -> List[pajson.ParseOptions]:
+        """
+        Returns the parse options to try parsing `stream` with, in order - first with the schema
+        inferred from a sample imposed, and then without it.
+
+        When all of the requested `columns` are in the sampled schema, the schema is first restricted
+        to them, so that the values of all other keys are skipped while parsing. When flattening,
+        the dotted `columns` are restricted to the top level keys they are nested in.
+        """
+        if flatten and columns is not None:
+            columns = list(dict.fromkeys(column.split(".")[0] for column in columns))
+        schema = JSON_Lines._infer_schema(stream)
+        options = []
+        if schema is not None:
+            if columns is not None and all(column in schema.names for column in columns):
+                projected = pa.schema([schema.field(column) for column in columns])
+                options.append(pajson.ParseOptions(explicit_schema=projected, unexpected_field_behavior="ignore"))
+            options.append(pajson.ParseOptions(explicit_schema=schema, unexpected_field_behavior="infer"))
+        options.append(pajson.ParseOptions(unexpected_field_behavior="infer"))
+        return options
+
     @staticmethod
-    def stream_to_dataframe(stream: io.BytesIO) -> pd.DataFrame:
-        return pd.DataFrame.from_records(json.loads(row) for row in stream.readlines())
+    def _select(table: pa.Table, columns: Optional[Sequence[str]], flatten: bool = False) -> pa.Table:
+        # Keys which were not in the sampled schema have their dates and times inferred as well
+        schema = pa.schema([field.with_type(JSON_Lines._string_type(field.type)) for field in table.schema])
+        if schema != table.schema:
+            table = table.cast(schema)
+        if flatten:
+            table = flatten_structs(table)
+        if columns is None:
+            return table
+        return table.select([column for column in columns if column in table.column_names])
+
+    @staticmethod
+    def _infer_schema(stream: io.BytesIO) -> Optional[pa.Schema]:
+        """
+        Infers the schema of the records from a sample of them. Fields which are only ever
+        null in the sample are left out, so that their type is inferred from the rest of the records,
+        and dates and times are kept as strings.
+        """
+        records = read_text_sample(stream)
+        if not records:
+            return None
+
+        try:
+            schema = pajson.read_json(io.BytesIO("".join(records).encode())).schema
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return None
+        fields = [field for field in schema if not pa.types.is_null(field.type)]
+        return pa.schema([field.with_type(JSON_Lines._string_type(field.type)) for field in fields])
+
+    @staticmethod
+    def _string_type(arrow_type: pa.DataType) -> pa.DataType:
+        """
+        Returns:
+            `arrow_type` with the dates and times (which pyarrow infers from strings) replaced by strings,
+            at any depth, so that the values are printed as they are in the file
+        """
+        if pa.types.is_temporal(arrow_type):
+            return pa.string()
+        if pa.types.is_struct(arrow_type):
+            return pa.struct([field.with_type(JSON_Lines._string_type(field.type)) for field in arrow_type])
+        if pa.types.is_list(arrow_type):
+            return pa.list_(arrow_type.value_field.with_type(JSON_Lines._string_type(arrow_type.value_type)))
+        if pa.types.is_large_list(arrow_type):
+            return pa.large_list(arrow_type.value_field.with_type(JSON_Lines._string_type(arrow_type.value_type)))
+        return arrow_type
 
     @staticmethod
     def is_valid_input(buffer: io.BytesIO) -> bool:
-        with zero_buffer(buffer) as b:
-            if len(b.read()) == 0:
-                return False
+        records = read_text_sample(buffer)
+        if not records:
+            return False
 
-        with zero_buffer(buffer) as b:
-            for line in b.read().decode().splitlines():
-                if line.strip() != "" and (line[0] != "{" or line[-1] != "}"):
-                    return False
+        for record in records:
+            record = record.strip()
+            if record[0] != "{" or record[-1] != "}":
+                return False
         return True
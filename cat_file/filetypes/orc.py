@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import io
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.orc as orc
+
+from cat_file.filetypes._arrow import as_arrow_input
+from cat_file.filetypes._arrow import prepare_table
+from cat_file.filetypes._arrow import root_columns
+from cat_file.filetypes._arrow import select_columns
+from cat_file.filetypes._arrow import select_table_columns
+from cat_file.filetypes._base import DataFile
+from cat_file.filetypes._manager import filetype
+from cat_file.filters import Filter
+from cat_file.logging import logger as __logger
+from cat_file.stream import ensure_random_access
+from cat_file.stream import get_size
+from cat_file.stream import read_prefix
+from cat_file.stream import zero_buffer
+
+logger = __logger.getChild(__name__)
+
+
+@filetype.register(code="o", signatures=(b"ORC",), extensions=(".orc",))
+class ORC(DataFile):
+    @staticmethod
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Filter] = None,
+        flatten: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            flatten: Whether to replace struct columns with a column per (nested) field, named by
+                its dotted path
+        """
+        columns = list(columns) if columns is not None else None
+        orc_file = ORC._open(stream)
+        read_columns = root_columns(orc_file.schema, columns, where, flatten)
+        if num_lines is None:
+            table = prepare_table(orc_file.read(columns=read_columns), where, flatten)
+        else:
+            table = ORC._read_stripes(orc_file, num_lines, read_columns, where, flatten)
+        df = select_table_columns(table, columns).to_pandas()
+        if num_lines is not None and num_lines < 0 and where is None:
+            # The rows keep their positions in the file, which its footer tells
+            df = ORC._number_tail(df, orc_file.nrows)
+        return df
+
+    @staticmethod
+    def _read_stripes(
+        orc_file: orc.ORCFile,
+        num_lines: int,
+        read_columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Reads the first `num_lines` rows (which match `where`), or the last ones if `num_lines` is negative,
+        decoding a stripe at a time from the start (or the end) of the file until there are enough rows
+        """
+        from_end = num_lines < 0
+        num_lines = abs(num_lines)
+        stripes = range(orc_file.nstripes)
+        tables = []
+        num_rows = 0
+        for i in reversed(stripes) if from_end else stripes:
+            if num_rows >= num_lines:
+                break
+            batch = orc_file.read_stripe(i, columns=read_columns)
+            tables.append(prepare_table(pa.Table.from_batches([batch]), where, flatten))
+            num_rows += tables[-1].num_rows
+        logger.debug(f"Read {len(tables)} of {orc_file.nstripes} stripes with {num_rows} rows for {num_lines} rows")
+
+        if from_end:
+            tables.reverse()
+        if not tables:
+            table = orc_file.schema.empty_table()
+            if read_columns is not None:
+                table = table.select(read_columns)
+            tables = [prepare_table(table, where, flatten)]
+        table = pa.concat_tables(tables)
+        return table.slice(max(table.num_rows - num_lines, 0)) if from_end else table.slice(0, num_lines)
+
+    @staticmethod
+    def _open(stream: io.BytesIO) -> orc.ORCFile:
+        return orc.ORCFile(as_arrow_input(stream))
+
+    @classmethod
+    def describe_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        """
+        Describes the file from its footer. The only column data which is decoded is for the null
+        and unique value counts, one column at a time.
+        """
+        with zero_buffer(buffer) as b:
+            orc_file = cls._open(ensure_random_access(b))
+            names = select_columns(orc_file.schema, columns)
+
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(orc_file.schema.field(name).type) for name in names]
+            counts = [cls._count_nulls_and_distinct(orc_file, name) for name in names]
+            output["Null Count"] = [null_count for null_count, _ in counts]
+            output["# Unique"] = [distinct_count for _, distinct_count in counts]
+            cls._print_description(orc_file.nrows, output)
+        return True
+
+    @classmethod
+    def schema_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        with zero_buffer(buffer) as b:
+            schema = cls._open(ensure_random_access(b)).schema
+            names = select_columns(schema, columns)
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(schema.field(name).type) for name in names]
+            cls._print_schema(output)
+        return True
+
+    @staticmethod
+    def _count_nulls_and_distinct(orc_file: orc.ORCFile, name: str) -> Tuple[int, Optional[int]]:
+        """
+        Returns:
+            The number of nulls and of unique non-null values in the column `name`. The unique
+            values are `None` if the column's type can't be counted.
+        """
+        logger.debug(f"Decoding the column {name} to count its nulls and unique values")
+        column = orc_file.read(columns=[name]).column(0)
+        try:
+            return column.null_count, pc.count_distinct(column).as_py()
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            return column.null_count, None
+
+    @staticmethod
+    def is_valid_input(buffer: io.BytesIO) -> bool:
+        if read_prefix(buffer, 3) != b"ORC":
+            return False
+        size = get_size(buffer)
+        if size is None:
+            # The postscript is at the end of the file, so only the start of a piped input can be checked
+            return True
+
+        # Text files can start with "ORC" as well, but only ORC files end with a postscript
+        # which ends with "ORC" followed by its length
+        with zero_buffer(buffer) as b:
+            b.seek(max(size - 4, 0))
+            return b.read(3) == b"ORC"
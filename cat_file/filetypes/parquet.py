@@ -1,24 +1,454 @@
 from __future__ import annotations
 
 import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from cat_file.errors import ColumnNotFoundError
+from cat_file.filetypes._arrow import count_distinct
+from cat_file.filetypes._arrow import flatten_structs
+from cat_file.filetypes._arrow import prepare_table
+from cat_file.filetypes._arrow import select_columns
+from cat_file.filetypes._arrow import select_table_columns
 from cat_file.filetypes._base import DataFile
 from cat_file.filetypes._manager import filetype
+from cat_file.filters import Filter
 from cat_file.logging import logger as __logger
+from cat_file.stream import ensure_random_access
+from cat_file.stream import get_buffer
+from cat_file.stream import get_size
+from cat_file.stream import read_prefix
 from cat_file.stream import zero_buffer
 
 logger = __logger.getChild(__name__)
 
 
-@filetype.register(code="p")
+@filetype.register(code="p", signatures=(b"PAR1",), extensions=(".parquet", ".pq"))
 class Parquet(DataFile):
+    # The smallest number of rows to decode at a time when reading the head of a file
+    MIN_HEAD_BATCH_SIZE = 1024
+    # The input size from which the row groups of random access inputs are decoded in parallel
+    PARALLEL_ENGINE_MIN_SIZE = 256 * 1024 * 1024
+    # The largest part of a column's bytes which its dictionary can take for it to be loaded as a categorical
+    MAX_DICTIONARY_RATIO = 0.5
+    # The largest number of row groups whose footer metadata is sampled to pick the dictionary columns
+    DICTIONARY_SAMPLE_SIZE = 16
+
     @staticmethod
-    def stream_to_dataframe(stream: io.BytesIO) -> pd.DataFrame:
-        return pd.read_parquet(stream, engine="pyarrow")
+    def stream_to_dataframe(
+        stream: io.BytesIO,
+        *,
+        num_lines: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Filter] = None,
+        engine: Optional[str] = None,
+        flatten: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Args:
+            engine: The engine to fully load the data with - "pyarrow" or "parallel". By default,
+                the row groups of very large random access inputs are decoded in parallel
+            flatten: Whether to replace struct columns with a column per (nested) field, named by
+                its dotted path. Dotted `columns` are then read without decoding their sibling fields.
+        """
+        columns = list(columns) if columns is not None else None
+        parquet_file = Parquet._open(stream)
+        if num_lines is not None and num_lines >= 0:
+            table = Parquet._read_head(parquet_file, num_lines, columns, where, flatten)
+        elif num_lines is not None:
+            table = Parquet._read_tail(parquet_file, -num_lines, columns, where, flatten)
+            df = table.to_pandas()
+            # The rows keep their positions in the file, which its footer tells
+            return Parquet._number_tail(df, parquet_file.metadata.num_rows) if where is None else df
+        elif (engine or Parquet._select_engine(stream)) == "parallel":
+            table = Parquet._read_parallel(parquet_file, get_buffer(stream), columns, where, flatten)
+        else:
+            table = Parquet._read_filtered(parquet_file, columns, where, flatten)
+        return table.to_pandas()
 
     @staticmethod
-    def is_valid_input(buffer: io.BytesIO) -> bool:
+    def _select_engine(stream: io.BytesIO) -> str:
+        size = get_size(stream)
+        is_very_large = size is not None and size >= Parquet.PARALLEL_ENGINE_MIN_SIZE
+        engine = "parallel" if is_very_large and (os.cpu_count() or 1) > 1 else "pyarrow"
+        logger.debug(f"Selected the {engine} engine")
+        return engine
+
+    @staticmethod
+    def _read_parallel(
+        parquet_file: pq.ParquetFile,
+        view: Optional[memoryview],
+        columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Fully loads `parquet_file`, which is read out of `view`, by decoding its row groups concurrently
+        in a thread pool (pyarrow releases the GIL while decoding). At most two row groups per thread
+        are decoded ahead of the ones which were collected, the tables are kept in the order of the
+        row groups, and they are only converted to pandas once all of them were decoded.
+        """
+        row_groups = Parquet._matching_row_groups(parquet_file, where, flatten)
+        if view is None or len(row_groups) < 2:
+            return Parquet._read_filtered(parquet_file, columns, where, flatten)
+
+        metadata = parquet_file.metadata
+        read_columns = Parquet._read_columns(columns, where)
+        read_dictionary = Parquet._dictionary_columns(metadata)
+        num_workers = os.cpu_count() or 1
+        logger.debug(f"Decoding {len(row_groups)} row groups with {num_workers} threads")
+
+        def decode(i: int) -> pa.Table:
+            # Each thread reads through its own reader, sharing the buffer and the parsed footer
+            reader = pq.ParquetFile(
+                pa.BufferReader(pa.py_buffer(view)), metadata=metadata, read_dictionary=read_dictionary
+            )
+            table = reader.read_row_group(i, columns=read_columns, use_threads=False, use_pandas_metadata=True)
+            return prepare_table(table, where, flatten)
+
+        tables = []
+        pending: deque = deque()
+        remaining = iter(row_groups)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            try:
+                while True:
+                    while len(pending) < 2 * num_workers:
+                        i = next(remaining, None)
+                        if i is None:
+                            break
+                        pending.append(executor.submit(decode, i))
+                    if not pending:
+                        break
+                    tables.append(pending.popleft().result())
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        return Parquet._concat(parquet_file, tables, columns, where, flatten)
+
+    @staticmethod
+    def _read_head(
+        parquet_file: pq.ParquetFile,
+        num_lines: int,
+        columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Reads the first `num_lines` rows (which match `where`), decoding the row groups a batch
+        at a time and stopping as soon as there are enough rows
+        """
+        row_groups = Parquet._matching_row_groups(parquet_file, where, flatten)
+        batch_size = max(num_lines, Parquet.MIN_HEAD_BATCH_SIZE)
+        if where is None:
+            # Every row counts, so the row counts in the footer tell which row groups are needed
+            row_groups = Parquet._leading_row_groups(parquet_file, row_groups, num_lines)
+            batch_size = max(num_lines, 1)
+
+        tables = []
+        remaining = num_lines
+        if remaining > 0 and row_groups:
+            for batch in parquet_file.iter_batches(
+                batch_size=batch_size,
+                row_groups=row_groups,
+                columns=Parquet._read_columns(columns, where),
+                use_pandas_metadata=True,
+            ):
+                tables.append(prepare_table(pa.Table.from_batches([batch]), where, flatten).slice(0, remaining))
+                remaining -= tables[-1].num_rows
+                if remaining <= 0:
+                    break
+
+        return Parquet._concat(parquet_file, tables, columns, where, flatten)
+
+    @staticmethod
+    def _read_tail(
+        parquet_file: pq.ParquetFile,
+        num_lines: int,
+        columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Reads the last `num_lines` rows (which match `where`), decoding only the trailing row groups.
+        Without a filter, the row counts in the footer tell which row groups are needed up front.
+        """
+        row_groups = Parquet._matching_row_groups(parquet_file, where, flatten)
+        read_columns = Parquet._read_columns(columns, where)
+        tables = []
+        num_rows = 0
+        if where is None:
+            row_groups = Parquet._leading_row_groups(parquet_file, row_groups[::-1], num_lines)[::-1]
+            table = parquet_file.read_row_groups(row_groups, columns=read_columns, use_pandas_metadata=True)
+            tables.append(prepare_table(table, where, flatten))
+            num_rows = table.num_rows
+        else:
+            for i in reversed(row_groups):
+                if num_rows >= num_lines:
+                    break
+                table = parquet_file.read_row_group(i, columns=read_columns, use_pandas_metadata=True)
+                tables.insert(0, prepare_table(table, where, flatten))
+                num_rows += tables[0].num_rows
+
+        logger.debug(f"Read {len(tables)} tables with {num_rows} rows for the last {num_lines} rows")
+        table = Parquet._concat(parquet_file, tables, columns, where, flatten)
+        return table.slice(max(table.num_rows - num_lines, 0))
+
+    @staticmethod
+    def _leading_row_groups(parquet_file: pq.ParquetFile, row_groups: List[int], num_lines: int) -> List[int]:
+        """
+        Returns:
+            The shortest prefix of `row_groups` which has at least `num_lines` rows, according to the footer
+        """
+        num_rows = 0
+        for count, i in enumerate(row_groups):
+            if num_rows >= num_lines:
+                return row_groups[:count]
+            num_rows += parquet_file.metadata.row_group(i).num_rows
+        return row_groups
+
+    @staticmethod
+    def _read_filtered(
+        parquet_file: pq.ParquetFile, columns: Optional[List[str]], where: Optional[Filter], flatten: bool
+    ) -> pa.Table:
+        """
+        Reads the rows of `parquet_file` which match `where`, skipping the row groups
+        whose footer statistics rule out every row
+        """
+        row_groups = Parquet._matching_row_groups(parquet_file, where, flatten)
+        read_columns = Parquet._read_columns(columns, where)
+        if where is None:
+            table = parquet_file.read(columns=read_columns, use_pandas_metadata=True)
+        else:
+            table = parquet_file.read_row_groups(row_groups, columns=read_columns, use_pandas_metadata=True)
+        return select_table_columns(prepare_table(table, where, flatten), columns)
+
+    @staticmethod
+    def _concat(
+        parquet_file: pq.ParquetFile,
+        tables: List[pa.Table],
+        columns: Optional[List[str]],
+        where: Optional[Filter],
+        flatten: bool,
+    ) -> pa.Table:
+        """
+        Concatenates the prepared `tables`, and selects the requested `columns`. Without any tables,
+        an empty table with the schema that reading `parquet_file` would have is returned.
+        """
+        if not tables:
+            table = parquet_file.read_row_groups([], columns=Parquet._read_columns(columns, where))
+            tables = [prepare_table(table, where, flatten)]
+        return select_table_columns(pa.concat_tables(tables), columns)
+
+    @staticmethod
+    def _matching_row_groups(parquet_file: pq.ParquetFile, where: Optional[Filter], flatten: bool) -> List[int]:
+        """
+        Returns:
+            The indices of the row groups which might have rows that match `where`, according
+            to their footer statistics
+        """
+        metadata = parquet_file.metadata
+        if where is None:
+            return list(range(metadata.num_row_groups))
+
+        schema = parquet_file.schema_arrow
+        if flatten:
+            schema = flatten_structs(schema.empty_table()).schema
+        missing_columns = [column for column in where.columns if column not in schema.names]
+        if missing_columns:
+            raise ColumnNotFoundError(missing_columns)
+
+        row_groups = [
+            i
+            for i in range(metadata.num_row_groups)
+            if where.may_match(Parquet._row_group_statistics(metadata.row_group(i)), schema)
+        ]
+        logger.debug(f"Reading {len(row_groups)} out of {metadata.num_row_groups} row groups")
+        return row_groups
+
+    @staticmethod
+    def _read_columns(columns: Optional[List[str]], where: Optional[Filter]) -> Optional[List[str]]:
+        """
+        Returns:
+            The columns which have to be decoded in order to filter the rows by `where` and select `columns`
+        """
+        if columns is None or where is None:
+            return columns
+        return [*columns, *(column for column in where.columns if column not in columns)]
+
+    @staticmethod
+    def _open(stream: io.BytesIO) -> pq.ParquetFile:
+        """
+        Opens `stream`, which supports random access, reading out of its buffer when it has one.
+        Dictionary encoded columns are read as dictionaries, which pandas loads as categoricals.
+        """
+        view = get_buffer(stream)
+        # Read straight out of the (possibly memory-mapped) buffer without copying it
+        source = pa.BufferReader(pa.py_buffer(view)) if view is not None else stream
+        metadata = pq.read_metadata(source)
+        return pq.ParquetFile(source, metadata=metadata, read_dictionary=Parquet._dictionary_columns(metadata))
+
+    @staticmethod
+    def _dictionary_columns(metadata: pq.FileMetaData) -> List[str]:
+        """
+        Returns:
+            The names of the top level string and binary columns which are dictionary encoded in every
+            sampled row group, with dictionaries which are small compared to the rest of the column (which
+            means that the values repeat). Pyarrow dictionary encodes every column by default, so columns
+            with mostly unique values have dictionaries too. Up to `DICTIONARY_SAMPLE_SIZE` row groups,
+            spread evenly over the file, are sampled.
+        """
+        num_row_groups = metadata.num_row_groups
+        if num_row_groups == 0:
+            return []
+
+        num_samples = min(num_row_groups, Parquet.DICTIONARY_SAMPLE_SIZE)
+        indices = sorted({i * (num_row_groups - 1) // max(num_samples - 1, 1) for i in range(num_samples)})
+        row_groups = [metadata.row_group(i) for i in indices]
+        columns = []
+        for j in range(metadata.num_columns):
+            chunks = [row_group.column(j) for row_group in row_groups]
+            if (
+                "." not in chunks[0].path_in_schema
+                and chunks[0].physical_type == "BYTE_ARRAY"
+                and all(chunk.has_dictionary_page for chunk in chunks)
+            ):
+                dictionary_size = sum(chunk.data_page_offset - chunk.dictionary_page_offset for chunk in chunks)
+                column_size = sum(chunk.total_compressed_size for chunk in chunks)
+                if dictionary_size <= column_size * Parquet.MAX_DICTIONARY_RATIO:
+                    columns.append(chunks[0].path_in_schema)
+        return columns
+
+    @classmethod
+    def describe_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        """
+        Describes the file from its footer. The only column data which is decoded is for
+        the unique value counts, one column at a time.
+        """
         with zero_buffer(buffer) as b:
-            return b.read(3) == b"PAR"
+            parquet_file = cls._open(ensure_random_access(b))
+            metadata = parquet_file.metadata
+            # The schema as stored in the file, without the columns which are read as dictionaries
+            schema = metadata.schema.to_arrow_schema()
+            names = select_columns(schema, columns)
+            statistics = cls._column_chunk_statistics(metadata, names)
+
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(schema.field(name).type) for name in names]
+            output["Null Count"] = [statistics[name]["null_count"] for name in names]
+            output["# Unique"] = [
+                statistics[name]["distinct_count"]
+                if statistics[name]["distinct_count"] is not None
+                else cls._count_distinct(parquet_file, name)
+                for name in names
+            ]
+            output["Min"] = [statistics[name]["min"] for name in names]
+            output["Max"] = [statistics[name]["max"] for name in names]
+            output["Compressed Size"] = [statistics[name]["compressed_size"] for name in names]
+            output["Uncompressed Size"] = [statistics[name]["uncompressed_size"] for name in names]
+            cls._print_description(metadata.num_rows, output)
+        return True
+
+    @classmethod
+    def schema_stream(cls, buffer: io.BytesIO, columns: Optional[Sequence[str]] = None, **options: Any) -> bool:
+        with zero_buffer(buffer) as b:
+            schema = cls._open(ensure_random_access(b)).metadata.schema.to_arrow_schema()
+            names = select_columns(schema, columns)
+            output = pd.DataFrame(index=pd.Index(names, name="Columns"))
+            output["Type"] = [str(schema.field(name).type) for name in names]
+            output["Nullable"] = [schema.field(name).nullable for name in names]
+            cls._print_schema(output)
+        return True
+
+    @staticmethod
+    def _column_chunk_statistics(metadata: pq.FileMetaData, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregates the statistics of the column chunks in every row group, per column. A statistic
+        is `None` when any of the row groups does not store it. Distinct counts can't be summed
+        across row groups, so they are only known for files with a single row group.
+        """
+        statistics = {
+            name: {
+                "null_count": 0,
+                "distinct_count": None,
+                "min": None,
+                "max": None,
+                "compressed_size": 0,
+                "uncompressed_size": 0,
+                "has_min_max": True,
+            }
+            for name in names
+        }
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                chunk = row_group.column(j)
+                name = chunk.path_in_schema.split(".")[0]
+                if name not in statistics:
+                    continue
+                column = statistics[name]
+                column["compressed_size"] += chunk.total_compressed_size
+                column["uncompressed_size"] += chunk.total_uncompressed_size
+                if name != chunk.path_in_schema:
+                    # The statistics of the leaves of nested columns don't describe the column itself
+                    column["null_count"] = column["has_min_max"] = None
+                    continue
+
+                stats = chunk.statistics
+                if stats is None or not stats.has_null_count or column["null_count"] is None:
+                    column["null_count"] = None
+                else:
+                    column["null_count"] += stats.null_count
+                if metadata.num_row_groups == 1 and stats is not None and stats.has_distinct_count:
+                    column["distinct_count"] = stats.distinct_count
+                if stats is None or not stats.has_min_max or not column["has_min_max"]:
+                    column["min"] = column["max"] = column["has_min_max"] = None
+                    continue
+                column["min"] = stats.min if column["min"] is None else min(column["min"], stats.min)
+                column["max"] = stats.max if column["max"] is None else max(column["max"], stats.max)
+        return statistics
+
+    @staticmethod
+    def _count_distinct(parquet_file: pq.ParquetFile, name: str) -> Optional[int]:
+        """
+        Returns:
+            The number of unique non-null values in the column `name`, or `None` if its type can't be counted
+        """
+        logger.debug(f"Decoding the column {name} to count its unique values")
+        return count_distinct(parquet_file.read(columns=[name]).column(0))
+
+    @staticmethod
+    def _row_group_statistics(row_group: pq.RowGroupMetaData) -> Dict[str, Tuple[Any, Any, Optional[int]]]:
+        """
+        Returns:
+            A mapping from the dotted paths of the leaf columns of `row_group` (which are the names of
+            flattened columns) to their minimum value, maximum value and null count, as stored in the footer
+        """
+        statistics = {}
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            stats = column.statistics
+            if stats is None:
+                continue
+            has_min_max = stats.has_min_max
+            statistics[column.path_in_schema] = (
+                stats.min if has_min_max else None,
+                stats.max if has_min_max else None,
+                stats.null_count if stats.has_null_count else None,
+            )
+        return statistics
+
+    @staticmethod
+    def is_valid_input(buffer: io.BytesIO) -> bool:
+        return read_prefix(buffer, 4) == b"PAR1"
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import ast
+import operator
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cat_file.errors import InvalidFilterError
+
+_COMPARISONS: Dict[type, str] = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    ast.In: "in",
+    ast.NotIn: "not in",
+}
+# The comparison which is equivalent to swapping the sides of each comparison
+_SWAPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class Filter:
+    """
+    A row filter parsed from a Python-like boolean expression, e.g.
+    `ts >= '2026-01-01' and (user_id == 42 or country in ('IL', 'US'))`.
+
+    Comparisons are between a column name and a literal, and can be combined with
+    `and`, `or` and `not`. The filter can be evaluated on a `pd.DataFrame`, converted to
+    a pyarrow expression, or checked against column statistics to tell whether any
+    row in a chunk of data (e.g. a Parquet row group) might match it.
+    """
+
+    def __init__(self, expression: str) -> None:
+        self._expression = expression
+        try:
+            self._tree = self._parse(ast.parse(expression, mode="eval").body)
+        except SyntaxError as e:
+            raise InvalidFilterError(expression, str(e)) from e
+
+    def __repr__(self) -> str:
+        return f"Filter({self._expression!r})"
+
+    def _source(self, node: ast.AST) -> str:
+        return ast.get_source_segment(self._expression, node) or type(node).__name__
+
+    def _parse(self, node: ast.AST) -> Tuple:
+        if isinstance(node, ast.BoolOp):
+            return ("and" if isinstance(node.op, ast.And) else "or", [self._parse(v) for v in node.values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ("not", self._parse(node.operand))
+        if isinstance(node, ast.Compare):
+            comparisons = []
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                comparisons.append(self._parse_comparison(left, op, right))
+                left = right
+            return comparisons[0] if len(comparisons) == 1 else ("and", comparisons)
+        raise InvalidFilterError(self._expression, f"Unsupported expression `{self._source(node)}`")
+
+    def _parse_comparison(self, left: ast.AST, op: ast.cmpop, right: ast.AST) -> Tuple:
+        if type(op) not in _COMPARISONS:
+            raise InvalidFilterError(self._expression, f"Unsupported comparison `{type(op).__name__}`")
+        comparison = _COMPARISONS[type(op)]
+
+        if self._column(right) is not None and self._column(left) is None and comparison in _SWAPPED:
+            left, right, comparison = right, left, _SWAPPED[comparison]
+        column = self._column(left)
+        if column is None:
+            raise InvalidFilterError(self._expression, f"Expected a column name, got `{self._source(left)}`")
+
+        try:
+            value = ast.literal_eval(right)
+        except ValueError as e:
+            raise InvalidFilterError(self._expression, f"Expected a literal, got `{self._source(right)}`") from e
+        if comparison in ("in", "not in") and not isinstance(value, (tuple, list, set)):
+            raise InvalidFilterError(self._expression, f"Expected a collection after `{comparison}`")
+        return (comparison, column, value)
+
+    @staticmethod
+    def _column(node: ast.AST) -> Optional[str]:
+        """
+        Returns:
+            The name of the column which `node` refers to - dotted for fields of flattened struct columns
+            (e.g. `event.user.id`) - or `None` if it is not a column
+        """
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            parent = Filter._column(node.value)
+            return f"{parent}.{node.attr}" if parent is not None else None
+        return None
+
+    @property
+    def columns(self) -> Tuple[str]:
+        """
+        Returns:
+            The names of the columns the filter refers to, in order of appearance
+        """
+
+        def collect(tree: Tuple) -> Tuple[str]:
+            if tree[0] in ("and", "or"):
+                return tuple(column for subtree in tree[1] for column in collect(subtree))
+            if tree[0] == "not":
+                return collect(tree[1])
+            return (tree[1],)
+
+        return tuple(dict.fromkeys(collect(self._tree)))
+
+    def to_mask(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Returns:
+            A boolean `pd.Series` of the rows of `df` which match the filter. Like in Arrow, comparisons
+            of nulls (other than with `None`) are unknown, so they never match, even when negated.
+        """
+
+        def evaluate(tree: Tuple) -> pd.Series:
+            kind = tree[0]
+            if kind in ("and", "or"):
+                masks = [evaluate(subtree) for subtree in tree[1]]
+                combine = operator.and_ if kind == "and" else operator.or_
+                result = masks[0]
+                for mask in masks[1:]:
+                    result = combine(result, mask)
+                return result
+            if kind == "not":
+                return ~evaluate(tree[1])
+
+            _, column, value = tree
+            series = df[column]
+            if value is None and kind in ("==", "!="):
+                return series.isnull() if kind == "==" else series.notnull()
+            if kind in ("in", "not in"):
+                mask = series.isin(list(value))
+                mask = mask if kind == "in" else ~mask
+            else:
+                mask = _OPERATORS[kind](series, value)
+            # A nullable boolean mask combines the unknown results of nulls like Arrow does
+            return mask.astype("boolean").mask(series.isnull())
+
+        return evaluate(self._tree).fillna(False).astype(bool)
+
+    def to_arrow(self, schema: pa.Schema) -> pc.Expression:
+        """
+        Converts the filter to a pyarrow expression, casting the literals to the types of the columns
+
+        Args:
+            schema: The schema of the data the expression is going to be evaluated on
+        """
+
+        def convert(tree: Tuple) -> pc.Expression:
+            kind = tree[0]
+            if kind in ("and", "or"):
+                expressions = [convert(subtree) for subtree in tree[1]]
+                combine = operator.and_ if kind == "and" else operator.or_
+                result = expressions[0]
+                for expression in expressions[1:]:
+                    result = combine(result, expression)
+                return result
+            if kind == "not":
+                return ~convert(tree[1])
+
+            _, column, value = tree
+            field = pc.field(column)
+            if value is None and kind in ("==", "!="):
+                return field.is_null() if kind == "==" else field.is_valid()
+
+            arrow_type = schema.field(column).type
+            if pa.types.is_dictionary(arrow_type):
+                # Dictionary columns are compared by their values
+                arrow_type = arrow_type.value_type
+            if kind in ("in", "not in"):
+                # Like other comparisons, checking whether a null is in the values has an unknown (null) result
+                expression = pc.if_else(
+                    field.is_valid(), field.isin(pa.array(list(value)).cast(arrow_type)), pa.scalar(None, pa.bool_())
+                )
+                return expression if kind == "in" else ~expression
+            return _OPERATORS[kind](field, pa.scalar(value).cast(arrow_type))
+
+        return convert(self._tree)
+
+    def may_match(self, statistics: Dict[str, Tuple[Any, Any, Optional[int]]], schema: pa.Schema) -> bool:
+        """
+        Checks whether any row of a chunk of data might match the filter, according to the
+        statistics of its columns. Missing or incomparable statistics never rule a chunk out.
+
+        Args:
+            statistics: A mapping from column names to their minimum value, maximum value and null count
+                in the chunk. The minimum and maximum can be `None` if they are unknown.
+            schema: The schema of the data, which the filter's literals are cast to
+
+        Returns:
+            `False` if no row can match the filter; otherwise, `True`
+        """
+
+        def cast(value: Any, column: str) -> Any:
+            arrow_type = schema.field(column).type
+            if pa.types.is_dictionary(arrow_type):
+                arrow_type = arrow_type.value_type
+            return pa.scalar(value).cast(arrow_type).as_py()
+
+        def check(tree: Tuple) -> bool:
+            kind = tree[0]
+            if kind == "and":
+                return all(check(subtree) for subtree in tree[1])
+            if kind == "or":
+                return any(check(subtree) for subtree in tree[1])
+            if kind == "not":
+                return True
+
+            _, column, value = tree
+            if column not in statistics:
+                return True
+            minimum, maximum, null_count = statistics[column]
+            if value is None and kind == "==":
+                return null_count is None or null_count > 0
+            if value is None or minimum is None or maximum is None:
+                return True
+
+            try:
+                if kind in ("in", "not in"):
+                    values = [cast(v, column) for v in value]
+                    if kind == "in":
+                        return any(minimum <= v <= maximum for v in values)
+                    return not (minimum == maximum and minimum in values)
+
+                value = cast(value, column)
+                return {
+                    "==": lambda: minimum <= value <= maximum,
+                    "!=": lambda: not minimum == maximum == value,
+                    "<": lambda: minimum < value,
+                    "<=": lambda: minimum <= value,
+                    ">": lambda: maximum > value,
+                    ">=": lambda: maximum >= value,
+                }[kind]()
+            except (TypeError, ValueError, pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                return True
+
+        return check(self._tree)
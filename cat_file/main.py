@@ -2,17 +2,29 @@
 from cat_file.cat_file import CatFile
 from cat_file.cli import get_args
 from cat_file.stream import load_file_stream
+from cat_file.utils import get_columns_from_args
+from cat_file.utils import get_filter_from_args
 from cat_file.utils import get_num_lines_to_print
 from cat_file.utils import get_path_from_args
 
 
 def main() -> None:
     args = get_args()
+    path = get_path_from_args(args)
     cf = CatFile(
-        buffer=load_file_stream(get_path_from_args(args)),
+        buffer=load_file_stream(path),
         file_type_flag=args.file_type_flag,
         describe=args.describe,
+        schema=args.schema,
         num_lines_to_print=get_num_lines_to_print(args),
+        path=path,
+        columns=get_columns_from_args(args),
+        where=get_filter_from_args(args),
+        flatten=args.flatten,
+        sheet=args.sheet,
+        list_sheets=args.list_sheets,
+        all_sheets=args.all_sheets,
+        metadata_only=args.metadata_only,
     )
     cf.run()
 
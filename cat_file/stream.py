@@ -1,29 +1,793 @@
+import bz2
+import codecs
+import gzip
 import io
+import lzma
+import mmap
+import os
+import re
+import stat
 import sys
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
 from typing import Optional
+from typing import Tuple
+from typing import Union
 
-from cat_file.logging import logger as __logger
+import numpy as np
 
+from cat_file.logging import logger as __logger
 
 logger = __logger.getChild(__name__)
 
+# The number of leading bytes of a stream that are made available for sniffing the file type
+PEEK_SIZE = 256 * 1024
+# The number of leading bytes of a stream that text file types are sniffed from
+SNIFF_SAMPLE_SIZE = int(os.environ.get("CAT_FILE_SNIFF_SAMPLE_SIZE", 64 * 1024))
+# The number of leading bytes the sniffing sample grows up to when it has no complete record
+MAX_SNIFF_SAMPLE_SIZE = 16 * 1024 * 1024
+# The number of bytes which are compared at a time when counting a byte in a buffer
+COUNT_WINDOW_SIZE = 16 * 1024 * 1024
+# The size of the blocks read when scanning a stream backwards from its end
+TAIL_BLOCK_SIZE = 64 * 1024
+# The number of compressed bytes fed to the decompressor at a time
+INFLATE_CHUNK_SIZE = 256 * 1024
+# The number of bytes a gzip member is inflated ahead of time when decompressing members in parallel,
+# which starts small (e.g. for --head) and doubles with every member which is read, up to the maximum
+MIN_SPECULATIVE_INFLATE_SIZE = 1024 * 1024
+SPECULATIVE_INFLATE_SIZE = 64 * 1024 * 1024
+# The number of bytes a candidate gzip member is inflated to check that it actually starts a member
+GZIP_PROBE_SIZE = 64 * 1024
+
+
+class MemoryMappedFile(io.RawIOBase):
+    """
+    A read-only, seekable file object backed by a memory map of a file descriptor.
+
+    Reading only copies the requested bytes, and `getbuffer` exposes the whole
+    mapping as a read-only `memoryview`, so consumers such as pyarrow can use the
+    data without copying it into the process' heap.
+    """
+
+    def __init__(self, fileno: int) -> None:
+        super().__init__()
+        self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._mmap)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._mmap.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mmap.seek(offset, whence)
+        return self._mmap.tell()
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        return self._mmap.read(-1 if size is None else size)
+
+    def readall(self) -> bytes:
+        return self._mmap.read()
+
+    def readinto(self, b) -> int:
+        position = self._mmap.tell()
+        num_bytes = min(len(b), len(self._mmap) - position)
+        with memoryview(b) as view:
+            view[:num_bytes] = self._mmap[position : position + num_bytes]
+        self._mmap.seek(position + num_bytes)
+        return num_bytes
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            return self._mmap.readline()
+        return super().readline(size)
+
+    def getbuffer(self) -> memoryview:
+        """
+        Returns:
+            A read-only `memoryview` over the entire mapped file
+        """
+        return memoryview(self._mmap)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out by `getbuffer` are still alive; the mapping is released with them
+                logger.debug("Memory map still has exported buffers, leaving it open")
+        super().close()
+
+
+class PeekableStream(io.RawIOBase):
+    """
+    A forward-only stream over a non-seekable source (e.g. a pipe).
+
+    The leading bytes of the source can be inspected with `prefix` without consuming them.
+    Only the peeked prefix is buffered; reading replays the prefix and then continues
+    with the live source, so nothing has to wait for the whole source to be read.
+    While the read position is inside the buffered prefix, the stream can be seeked
+    within it (e.g. by `zero_buffer`), afterwards the prefix is released and the stream
+    is no longer seekable.
+    """
+
+    def __init__(self, raw: io.IOBase) -> None:
+        super().__init__()
+        self._raw = raw
+        self._prefix = bytearray()
+        self._position = 0
+        self._released = False
+
+    def prefix(self, size: int = PEEK_SIZE) -> bytes:
+        """
+        Returns up to `size` bytes from the start of the stream without consuming them
 
-def load_file_stream(path: Optional[str] = None) -> io.BytesIO:
+        Args:
+            size: The maximal number of bytes to return
+
+        Raises:
+            io.UnsupportedOperation if the stream was already read beyond the buffered prefix
+        """
+        if self._released:
+            raise io.UnsupportedOperation("The stream was already read beyond its buffered prefix")
+
+        while len(self._prefix) < size:
+            chunk = self._raw.read(size - len(self._prefix))
+            if not chunk:
+                break
+            self._prefix += chunk
+        return bytes(self._prefix[:size])
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return not self._released
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Can only seek relative to the start or the current position")
+
+        if self._released or not 0 <= offset <= len(self._prefix):
+            raise io.UnsupportedOperation("Can only seek within the buffered prefix of the stream")
+        self._position = offset
+        return offset
+
+    def _read_prefix(self, size: int) -> bytes:
+        data = bytes(self._prefix[self._position : self._position + size])
+        self._position += len(data)
+        return data
+
+    def _release(self) -> None:
+        if not self._released:
+            logger.debug(f"Releasing the {len(self._prefix)} buffered bytes of the stream")
+            self._released = True
+            self._prefix = bytearray()
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._read_prefix(len(self._prefix)) if not self._released else b""
+            self._release()
+            rest = self._raw.read()
+            self._position += len(rest)
+            return data + rest
+
+        data = self._read_prefix(size) if not self._released else b""
+        if len(data) < size:
+            self._release()
+            rest = self._raw.read(size - len(data))
+            self._position += len(rest)
+            data += rest
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        with memoryview(b) as view:
+            view[: len(data)] = data
+        return len(data)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        if size is not None and size >= 0:
+            return super().readline(size)
+
+        data = b""
+        if not self._released:
+            end = self._prefix.find(b"\n", self._position)
+            if end >= 0:
+                return self._read_prefix(end + 1 - self._position)
+            data = self._read_prefix(len(self._prefix))
+
+        self._release()
+        rest = self._raw.readline()
+        self._position += len(rest)
+        return data + rest
+
+
+def read_prefix(buffer: io.IOBase, size: int = PEEK_SIZE) -> bytes:
     """
-    Loads the correct data to a `io.BytesIO` object.
+    Returns up to `size` bytes from the start of `buffer` without changing its position
+
+    Args:
+        buffer: A `PeekableStream` or a seekable stream object
+        size: The maximal number of bytes to return
+    """
+    if isinstance(buffer, PeekableStream):
+        return buffer.prefix(size)
+    with zero_buffer(buffer) as b:
+        return b.read(size)
+
+
+def read_text_sample(
+    buffer: io.IOBase, quotechar: Optional[bytes] = None, size: int = SNIFF_SAMPLE_SIZE
+) -> Optional[List[str]]:
+    """
+    Returns the complete records found in the first `size` bytes of `buffer`, decoded as UTF-8.
+    If the sample was cut off, its last (possibly partial) record is dropped. When that leaves no
+    record, the sample grows until it holds a complete record, up to `MAX_SNIFF_SAMPLE_SIZE`
+    bytes, after which the partial first record is kept.
+
+    Args:
+        buffer: A `PeekableStream` or a seekable stream object
+        quotechar: The quote character of the records, if any
+        size: The maximal number of bytes to sample, unless the first record is longer
+
+    Returns:
+        A `list` of the decoded records, or `None` if the sample is not valid UTF-8
+    """
+    while True:
+        sample = read_prefix(buffer, size)
+        records = list(iter_records(io.BytesIO(sample), quotechar=quotechar))
+        is_partial = len(sample) == size
+        if not is_partial or len(records) > 1 or size >= MAX_SNIFF_SAMPLE_SIZE:
+            break
+        size = min(size * 4, MAX_SNIFF_SAMPLE_SIZE)
+    if is_partial and len(records) > 1:
+        records = records[:-1]
+        is_partial = False
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoded = [decoder.decode(record) for record in records]
+        # A partial record may end in the middle of a character
+        decoder.decode(b"", final=not is_partial)
+    except UnicodeDecodeError:
+        return None
+    return decoded
+
+
+def is_random_access(stream: io.IOBase) -> bool:
+    """
+    Returns:
+        `True` if any position of `stream` can be seeked to; otherwise, `False`
+    """
+    return stream.seekable() and not isinstance(stream, PeekableStream)
+
+
+def _count_byte(view: memoryview, byte: bytes, start: int, end: int) -> int:
+    # numpy releases the GIL while comparing, so several ranges can be counted concurrently. The range
+    # is counted a window at a time, so that the comparison's temporary array stays small.
+    values = np.frombuffer(view, dtype=np.uint8, count=end - start, offset=start)
+    return sum(
+        int(np.count_nonzero(values[i : i + COUNT_WINDOW_SIZE] == ord(byte)))
+        for i in range(0, len(values), COUNT_WINDOW_SIZE)
+    )
+
+
+def count_records(stream: io.IOBase, end: int, quotechar: Optional[bytes] = None) -> int:
+    """
+    Counts the newline-terminated records in the first `end` bytes of a random access `stream`
+    without parsing them, `COUNT_WINDOW_SIZE` bytes at a time. When `quotechar` is given, newlines
+    inside quoted fields are not counted: a newline ends a record when an even number of quote
+    characters precede it.
+
+    Args:
+        stream: A random access stream object
+        end: The offset to count the records up to
+        quotechar: The quote character of the records, if any
+
+    Returns:
+        The number of records
+    """
+    num_records = 0
+    num_quotes = 0
+    with zero_buffer(stream) as s:
+        while s.tell() < end:
+            window = np.frombuffer(s.read(min(COUNT_WINDOW_SIZE, end - s.tell())), dtype=np.uint8)
+            if len(window) == 0:
+                break
+            newlines = np.flatnonzero(window == ord("\n"))
+            if quotechar is None:
+                num_records += len(newlines)
+                continue
+            quotes = np.flatnonzero(window == ord(quotechar))
+            quotes_before_newlines = np.searchsorted(quotes, newlines) + num_quotes
+            num_records += int(np.count_nonzero(quotes_before_newlines % 2 == 0))
+            num_quotes += len(quotes)
+    return num_records
+
+
+def _next_record_start(
+    view: memoryview, position: int, end: int, quotechar: Optional[bytes], in_quotes: bool
+) -> Optional[int]:
+    """
+    Returns the offset of the first record which starts after `position` (and up to `end`),
+    given whether `position` is inside a quoted field, or `None` if no record starts there
+    """
+    while position < end:
+        window = bytes(view[position : min(position + TAIL_BLOCK_SIZE, end)])
+        start = 0
+        while (newline := window.find(b"\n", start)) >= 0:
+            if quotechar is not None:
+                in_quotes ^= window.count(quotechar, start, newline) % 2 == 1
+            if not in_quotes:
+                return position + newline + 1
+            start = newline + 1
+
+        if quotechar is not None:
+            in_quotes ^= window.count(quotechar, start) % 2 == 1
+        position += len(window)
+    return None
+
+
+def split_records(
+    view: memoryview, num_ranges: int, quotechar: Optional[bytes] = None, max_workers: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Splits `view` into (up to) `num_ranges` byte ranges of roughly the same size, which are
+    aligned to the boundaries of its newline-separated records.
+
+    When `quotechar` is given, newlines inside quoted fields are not treated as record boundaries.
+    The quote characters of each range are counted concurrently first, so that the parity of the
+    quotes preceding each range tells whether it starts inside a quoted field. The first record
+    boundary of each range is then searched for concurrently, up to the end of the range; a range
+    in which no record starts is merged into the previous one.
+
+    Args:
+        view: A `memoryview` over the records
+        num_ranges: The number of ranges to split the records into
+        quotechar: The quote character of the records, if any
+        max_workers: The number of threads to scan the ranges with
+
+    Returns:
+        A `list` of the (start, end) offsets of the ranges, in order
+    """
+    size = len(view)
+    bounds = sorted({size * i // num_ranges for i in range(num_ranges)} | {size})
+    ranges = list(zip(bounds, bounds[1:]))
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        starts_in_quotes = [False] * len(ranges)
+        if quotechar is not None:
+            counts = list(executor.map(lambda r: _count_byte(view, quotechar, *r), ranges))
+            for i in range(1, len(ranges)):
+                starts_in_quotes[i] = starts_in_quotes[i - 1] ^ (counts[i - 1] % 2 == 1)
+
+        def find_start(i: int) -> Optional[int]:
+            start, end = ranges[i]
+            return 0 if start == 0 else _next_record_start(view, start, end, quotechar, starts_in_quotes[i])
+
+        found = list(executor.map(find_start, range(len(ranges))))
+
+    starts = sorted({start for start in found if start is not None and start < size}) or [0]
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def get_size(stream: io.IOBase) -> Optional[int]:
+    """
+    Returns:
+        The size of `stream` in bytes if it is random access; otherwise, `None`
+    """
+    if not is_random_access(stream):
+        return None
+
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def iter_records(stream: io.IOBase, quotechar: Optional[bytes] = None) -> Iterator[bytes]:
+    """
+    Splits `stream` into its raw newline-separated records, reading it front to back.
+    Blank records are skipped.
+
+    When `quotechar` is given, newlines inside quoted fields are not treated as record
+    boundaries, i.e. lines are joined until the record's quotes are balanced.
+
+    Args:
+        stream: A readable stream object
+        quotechar: The quote character of the records, if any
+
+    Returns:
+        An iterator over the raw records, including their line terminators
+    """
+    record = b""
+    num_quotes = 0
+    for line in stream:
+        record += line
+        if quotechar is not None:
+            num_quotes += line.count(quotechar)
+            if num_quotes % 2 == 1:
+                continue
+
+        if record.strip():
+            yield record
+        record = b""
+        num_quotes = 0
+
+    if record.strip():
+        yield record
+
+
+def iter_record_starts_reversed(
+    stream: io.IOBase, quotechar: Optional[bytes] = None, block_size: int = TAIL_BLOCK_SIZE
+) -> Iterator[int]:
+    """
+    Scans a random access `stream` backwards from its end, one block at a time, and
+    yields the offsets at which its newline-separated records start, starting from
+    the last record. Blank records are skipped, and the start of the stream is never
+    yielded, so the first record of the stream is not reported.
+
+    When `quotechar` is given, newlines inside quoted fields are not treated as record
+    boundaries. Since every complete record has balanced quotes, a newline separates
+    two records exactly when the number of quote characters following it is even.
+
+    Args:
+        stream: A random access stream object
+        quotechar: The quote character of the records, if any
+        block_size: The number of bytes to read at a time
+
+    Returns:
+        An iterator over the offsets of the records' starts
+    """
+    position = stream.seek(0, io.SEEK_END)
+    num_quotes = 0
+    record_has_data = False
+    while position > 0:
+        start = max(0, position - block_size)
+        stream.seek(start)
+        block = stream.read(position - start)
+
+        end = len(block)
+        while end > 0:
+            newline = block.rfind(b"\n", 0, end)
+            segment = block[newline + 1 : end]
+            if quotechar is not None:
+                num_quotes += segment.count(quotechar)
+            record_has_data = record_has_data or bool(segment.strip())
+            if newline < 0:
+                break
+
+            end = newline
+            if record_has_data and num_quotes % 2 == 0:
+                record_has_data = False
+                yield start + newline + 1
+        position = start
+
+
+def ensure_random_access(stream: io.IOBase) -> io.IOBase:
+    """
+    Makes sure that the whole of `stream` can be seeked, reading the remainder of a
+    `PeekableStream` into memory when needed. Other streams are returned as is.
+
+    Args:
+        stream: A stream object positioned at its start
+    """
+    if not is_random_access(stream):
+        logger.debug("Reading the rest of the stream into memory for random access")
+        return io.BytesIO(stream.read())
+    return stream
+
+
+class _GzipMemberInflater:
+    """
+    Inflates the gzip member which starts at `start` in `view`, a bounded amount at a time
+    """
+
+    def __init__(self, view: memoryview, start: int) -> None:
+        self._view = view
+        self._position = start
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self.end: Optional[int] = None
+
+    def inflate(self, size: int) -> bytes:
+        """
+        Inflates the member until it ends or at least `size` bytes were inflated
+
+        Returns:
+            The inflated bytes
+        """
+        chunks = []
+        num_bytes = 0
+        while self.end is None and num_bytes < size:
+            if self._position >= len(self._view):
+                raise zlib.error("The gzip member is truncated")
+
+            chunk = self._view[self._position : self._position + INFLATE_CHUNK_SIZE]
+            self._position += len(chunk)
+            chunks.append(self._decompressor.decompress(chunk))
+            num_bytes += len(chunks[-1])
+            if self._decompressor.eof:
+                self.end = self._position - len(self._decompressor.unused_data)
+        return b"".join(chunks)
+
+
+def _speculatively_inflate(view: memoryview, start: int, size: int) -> Tuple[_GzipMemberInflater, bytes]:
+    inflater = _GzipMemberInflater(view, start)
+    return inflater, inflater.inflate(size)
+
+
+def _is_gzip_header(header: bytes) -> bool:
+    """
+    Returns:
+        `True` if `header` (at least 10 bytes) is a plausible gzip member header: deflate compressed,
+        without reserved flags, with a known extra flag and a known operating system
+    """
+    return (
+        len(header) >= 10
+        and header[:3] == b"\x1f\x8b\x08"
+        and header[3] & 0xE0 == 0
+        and header[8] in (0, 2, 4)
+        and (header[9] <= 13 or header[9] == 255)
+    )
+
+
+def _is_gzip_member_start(view: memoryview, position: int) -> bool:
+    """
+    Returns:
+        `True` if a gzip member (probably) starts at `position`, i.e. the first bytes
+        after it can be inflated
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    try:
+        decompressor.decompress(view[position : position + GZIP_PROBE_SIZE], GZIP_PROBE_SIZE)
+    except zlib.error:
+        return False
+    return True
+
+
+def _iter_gzip_member_starts(view: memoryview) -> Iterator[int]:
+    """
+    Yields the offsets at which the gzip members of `view` (might) start.
+
+    For BGZF files, where every member declares its size in its header, the offsets are exact.
+    Otherwise, every occurrence of the gzip magic bytes is a candidate, which might turn out
+    to be part of a member's compressed data.
+    """
+    header = bytes(view[:18])
+    if header[:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC":
+        position = 0
+        while position < len(view):
+            header = bytes(view[position : position + 18])
+            if header[:2] != b"\x1f\x8b" or header[12:14] != b"BC":
+                return
+            yield position
+            position += int.from_bytes(header[16:18], "little") + 1
+        return
+
+    for match in re.finditer(b"\x1f\x8b\x08", view):
+        if _is_gzip_header(bytes(view[match.start() : match.start() + 10])):
+            yield match.start()
+
+
+class ParallelGzipReader(io.RawIOBase):
+    """
+    A forward-only reader of a multi-member gzip (or BGZF) buffer, which inflates its members
+    concurrently in a thread pool, while keeping the output in order.
+
+    Member boundaries cannot be found without inflating, so every candidate member start is
+    inflated speculatively. The speculative size starts at `MIN_SPECULATIVE_INFLATE_SIZE` bytes,
+    so that reading only the start of the data inflates little, and doubles with every member
+    which is read, up to `SPECULATIVE_INFLATE_SIZE` bytes. Candidates which turn out to be inside
+    another member are discarded, and members which are larger than the speculative size are
+    inflated the rest of the way as they are read. At most `max_in_flight` members are inflated
+    ahead of the reader.
+    """
+
+    def __init__(self, view: memoryview, max_workers: Optional[int] = None) -> None:
+        super().__init__()
+        max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._max_in_flight = 2 * max_workers
+        self._speculative_size = MIN_SPECULATIVE_INFLATE_SIZE
+        self._view = view
+        self._chunks = self._iter_members()
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def _iter_members(self) -> Iterator[bytes]:
+        starts = _iter_gzip_member_starts(self._view)
+        pending: deque = deque()
+        expected_start = 0
+        try:
+            while True:
+                while len(pending) < self._max_in_flight:
+                    start = next(starts, None)
+                    if start is None:
+                        break
+                    future = self._executor.submit(_speculatively_inflate, self._view, start, self._speculative_size)
+                    pending.append((start, future))
+                if not pending:
+                    break
+
+                start, future = pending.popleft()
+                if start < expected_start:
+                    # The candidate was inside the previous member
+                    future.cancel()
+                    continue
+                if start > expected_start:
+                    break
+
+                inflater, data = future.result()
+                yield data
+                while inflater.end is None:
+                    yield inflater.inflate(INFLATE_CHUNK_SIZE)
+                expected_start = inflater.end
+                self._speculative_size = min(2 * self._speculative_size, SPECULATIVE_INFLATE_SIZE)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            self._executor.shutdown(wait=False)
+
+        if any(self._view[expected_start:]):
+            logger.warning(f"Ignoring {len(self._view) - expected_start:,} trailing bytes after the gzip data")
+
+    def readinto(self, b) -> int:
+        while len(self._chunk) == 0:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk = memoryview(chunk)
+
+        num_bytes = min(len(b), len(self._chunk))
+        with memoryview(b) as view:
+            view[:num_bytes] = self._chunk[:num_bytes]
+        self._chunk = self._chunk[num_bytes:]
+        return num_bytes
+
+    def close(self) -> None:
+        if not self.closed:
+            self._chunks.close()
+        super().close()
+
+
+def _is_multi_member_gzip(view: memoryview) -> bool:
+    starts = _iter_gzip_member_starts(view)
+    if next(starts, None) != 0:
+        return False
+    # The magic bytes of a candidate might just be part of the first member's compressed data
+    return any(_is_gzip_member_start(view, start) for start in starts)
+
+
+# Magic bytes of the supported compression formats, and the readers which decompress them incrementally
+_DECOMPRESSORS: Dict[bytes, Tuple[str, Callable[[io.IOBase], io.IOBase]]] = {
+    b"\x1f\x8b": ("gzip", lambda stream: gzip.GzipFile(fileobj=stream, mode="rb")),
+    b"BZh": ("bz2", bz2.BZ2File),
+    b"\xfd7zXZ\x00": ("xz", lzma.LZMAFile),
+}
+
+
+def decompress_stream(stream: io.IOBase) -> io.IOBase:
+    """
+    Detects whether `stream` is compressed (gzip, bz2 or xz) according to its magic bytes,
+    and if so, wraps it with a reader which decompresses it incrementally. Since only a bounded
+    amount is decompressed ahead of time, reading stops decompressing as soon as reading stops.
+    Random access gzip inputs with several members (e.g. BGZF) are inflated in parallel.
+
+    Args:
+        stream: A stream object positioned at its start
+
+    Returns:
+        A `PeekableStream` over the decompressed data, or `stream` itself if it is not compressed
+    """
+    prefix = read_prefix(stream, 6)
+    for magic, (name, decompressor) in _DECOMPRESSORS.items():
+        if prefix.startswith(magic):
+            if magic == b"BZh" and not prefix[3:4].isdigit():
+                continue
+            if name == "gzip" and is_random_access(stream):
+                view = get_buffer(stream)
+                if view is not None and _is_multi_member_gzip(view):
+                    logger.info("Decompressing the multi-member gzip input in parallel")
+                    return PeekableStream(io.BufferedReader(ParallelGzipReader(view)))
+
+            logger.info(f"Decompressing the {name} compressed input")
+            return PeekableStream(decompressor(stream))
+    return stream
+
+
+def _is_regular_file(fileno: int) -> bool:
+    return stat.S_ISREG(os.fstat(fileno).st_mode)
+
+
+def _map_file(fileno: int) -> Union[MemoryMappedFile, io.BytesIO]:
+    if os.fstat(fileno).st_size == 0:
+        # Empty files cannot be memory-mapped
+        return io.BytesIO()
+    return MemoryMappedFile(fileno)
+
+
+def _stdin_fileno() -> Optional[int]:
+    try:
+        return sys.stdin.fileno()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def load_file_stream(path: Optional[str] = None) -> io.IOBase:
+    """
+    Loads the correct data to a readable stream object.
+
+    Regular files, and STDIN when it is redirected from a regular file, are memory-mapped
+    rather than read into memory. Other inputs (e.g. pipes and FIFOs) are read lazily
+    through a `PeekableStream`. Compressed inputs are decompressed on the fly.
+
     Args:
         path: If `path` is `None`, then the data is read from the `stdin`; otherwise,
             it is read from the provided `path`
+
     Returns:
-        A `io.BytesIO` object with the data
+        A `MemoryMappedFile` for regular files, otherwise a `PeekableStream` over the input
+        or over the decompressed data
     """
+    return decompress_stream(_open_file_stream(path))
+
+
+def _open_file_stream(path: Optional[str] = None) -> io.IOBase:
     if path is None:
-        logger.info("Reading STDIN to bytes buffer")
-        return io.BytesIO(sys.stdin.buffer.read())
-    logger.info("Loading path into bytes buffer")
-    return io.BytesIO(Path(path).read_bytes())
+        fileno = _stdin_fileno()
+        if fileno is not None and _is_regular_file(fileno):
+            logger.info("Memory-mapping STDIN redirected from a regular file")
+            return _map_file(fileno)
+
+        logger.info("Streaming STDIN")
+        return PeekableStream(sys.stdin.buffer)
+
+    f = open(path, "rb")
+    if not _is_regular_file(f.fileno()):
+        # e.g. FIFOs, /dev/stdin and process substitutions, which can't be memory-mapped
+        logger.info("Streaming path")
+        return PeekableStream(f)
+
+    logger.info("Memory-mapping path")
+    with f:
+        return _map_file(f.fileno())
+
+
+def get_buffer(stream: io.IOBase) -> Optional[memoryview]:
+    """
+    Returns a `memoryview` over the entire contents of `stream` without copying it,
+    when the stream supports it (e.g. `MemoryMappedFile` or `io.BytesIO`).
+
+    Args:
+        stream: A file-like object
+
+    Returns:
+        A `memoryview` over the data, or `None` if the stream is not backed by a buffer
+    """
+    getbuffer = getattr(stream, "getbuffer", None)
+    return getbuffer() if getbuffer is not None else None
 
 
 @contextmanager
@@ -50,10 +814,9 @@ def zero_buffer(buffer: io.IOBase) -> io.IOBase:
     if is_seekable := buffer.seekable():
         current_tell = buffer.tell()
         buffer.seek(0)
-
     try:
         yield buffer
-
     finally:
-        if is_seekable:
+        # A `PeekableStream` stops being seekable once it is read beyond its buffered prefix
+        if is_seekable and buffer.seekable():
             buffer.seek(current_tell)
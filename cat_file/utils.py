@@ -3,8 +3,10 @@ import sys
 from collections.abc import Iterable
 from functools import lru_cache
 from typing import Any
+from typing import List
 from typing import Union
 
+from .filters import Filter
 from .logging import logger as __logger
 
 
@@ -69,6 +71,36 @@ def get_num_lines_to_print(args: argparse.Namespace) -> Union[int, None]:
         return args.tail if args.tail < 0 else -args.tail
 
 
+def get_columns_from_args(args: argparse.Namespace) -> Union[List[str], None]:
+    """
+    Given the `argparse.Namespace` object, returns the names of the columns to load.
+
+    Args:
+        args: A `argparse.Namespace` object
+
+    Returns:
+        A `list` of the column names passed to `--columns`, or `None` if it was not passed
+    """
+    if args.columns is not None:
+        logger.debug(f"Received {args.columns=}")
+        return [column.strip() for column in args.columns.split(",") if column.strip()]
+
+
+def get_filter_from_args(args: argparse.Namespace) -> Union[Filter, None]:
+    """
+    Given the `argparse.Namespace` object, returns the filter for the rows to print.
+
+    Args:
+        args: A `argparse.Namespace` object
+
+    Returns:
+        A `Filter` parsed from the expression passed to `--where`, or `None` if it was not passed
+    """
+    if args.where is not None:
+        logger.debug(f"Received {args.where=}")
+        return Filter(args.where)
+
+
 def get_path_from_args(args: argparse.Namespace) -> Union[str, None]:
     if not should_read_from_stdin():
         return args.path[0] if isinstance(args.path, Iterable) else args.path
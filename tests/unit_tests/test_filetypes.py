@@ -1,12 +1,24 @@
 import io
 import json
+import re
+import zipfile
+from typing import List
 from typing import Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.orc as orc
+import pyarrow.parquet as pq
 import pytest
 
+from cat_file.cat_file import CatFile
+from cat_file.errors import ColumnNotFoundError
+from cat_file.errors import InvalidFilterError
+from cat_file.errors import SheetNotFoundError
 from cat_file.filetypes import DataFile
 from cat_file.filetypes import filetype
+from cat_file.filters import Filter
+from cat_file.stream import PeekableStream
 
 
 def provide_buffer(func):
@@ -34,6 +46,23 @@ class Convert:
             data.to_excel(f)
         return buffer
 
+    @staticmethod
+    @provide_buffer
+    def arrow(data: pd.DataFrame, buffer: Optional[io.BytesIO] = None) -> io.BytesIO:
+        data.to_feather(buffer)
+        return buffer
+
+    @staticmethod
+    @provide_buffer
+    def orc(data: pd.DataFrame, buffer: Optional[io.BytesIO] = None) -> io.BytesIO:
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        # ORC has no null type, so the columns with only nulls are written as strings
+        schema = pa.schema(
+            [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema]
+        )
+        orc.write_table(table.cast(schema), buffer)
+        return buffer
+
     @staticmethod
     @provide_buffer
     def csv(data: pd.DataFrame, buffer: Optional[io.BytesIO] = None) -> io.BytesIO:
@@ -70,3 +99,524 @@ def test_is_valid_input_wrong_file_type(obj: DataFile, data: pd.DataFrame) -> No
             except Exception:
                 is_valid = False
             assert not is_valid, f"{other_file_type.__name__ = }"
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+def test_piped_input(obj: DataFile, data: pd.DataFrame) -> None:
+    stream = PeekableStream(getattr(Convert, obj.__name__.lower())(data))
+    assert obj.is_valid_input(stream)
+    assert obj.from_bytes_stream(stream).contents.shape[0] == data.shape[0]
+
+
+@pytest.mark.parametrize("obj", [filetype.get_class("c"), filetype.get_class("jl")])
+def test_head_stops_reading(obj: DataFile, data: pd.DataFrame) -> None:
+    source = getattr(Convert, obj.__name__.lower())(pd.concat([data] * 20_000, ignore_index=True))
+    result = obj.from_bytes_stream(PeekableStream(source), num_lines=3)
+    assert result.contents.shape[0] == 3
+    assert source.tell() < len(source.getbuffer())
+
+
+@pytest.mark.parametrize("obj", [filetype.get_class(code) for code in ("c", "jl", "p", "a", "o")])
+@pytest.mark.parametrize("num_lines", [1, 3, 5, 8])
+def test_tail_of_random_access_stream(obj: DataFile, data: pd.DataFrame, num_lines: int) -> None:
+    data = data.assign(b=["x\ny", "a", 'say "hi"\n', "d", "e,f"])
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    result = obj.from_bytes_stream(stream, num_lines=-num_lines)
+    # The rows keep their positions in the file, like the tail of the whole file
+    expected = obj.from_bytes_stream(stream).contents.tail(num_lines)
+    pd.testing.assert_frame_equal(result.contents, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("num_lines", [3, 10, 25, -3, -10, -25])
+def test_parquet_head_and_tail_read_only_needed_row_groups(monkeypatch: pytest.MonkeyPatch, num_lines: int) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i) for i in range(100)]})
+    stream = io.BytesIO()
+    data.to_parquet(stream, row_group_size=10)
+
+    iter_batches = pq.ParquetFile.iter_batches
+    read_row_groups = pq.ParquetFile.read_row_groups
+    decoded_rows = []
+
+    def spy_iter_batches(self, *args, **kwargs):
+        for batch in iter_batches(self, *args, **kwargs):
+            decoded_rows.append(batch.num_rows)
+            yield batch
+
+    def spy_read_row_groups(self, *args, **kwargs):
+        table = read_row_groups(self, *args, **kwargs)
+        decoded_rows.append(table.num_rows)
+        return table
+
+    monkeypatch.setattr(pq.ParquetFile, "iter_batches", spy_iter_batches)
+    monkeypatch.setattr(pq.ParquetFile, "read_row_groups", spy_read_row_groups)
+    result = filetype.get_class("p").from_bytes_stream(stream, num_lines=num_lines).contents
+    # The rows of the tail keep their positions in the file
+    expected = data.head(num_lines) if num_lines > 0 else data.tail(-num_lines)
+    pd.testing.assert_frame_equal(result, expected)
+    assert sum(decoded_rows) == (num_lines if num_lines > 0 else -(num_lines // 10) * 10)
+
+
+@pytest.mark.parametrize("num_lines", [3, 10, 25, -3, -10, -25])
+@pytest.mark.parametrize("where", [None, "a >= 30"])
+def test_arrow_reads_only_needed_record_batches(monkeypatch, num_lines: int, where: Optional[str]) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i) for i in range(100)]})
+    stream = io.BytesIO()
+    with pa.ipc.new_file(stream, pa.Schema.from_pandas(data)) as writer:
+        writer.write_table(pa.Table.from_pandas(data), max_chunksize=10)
+
+    open_file = pa.ipc.open_file
+    read_batches = []
+
+    class SpyReader:
+        def __init__(self, source) -> None:
+            self._reader = open_file(source)
+
+        def __getattr__(self, name):
+            return getattr(self._reader, name)
+
+        def get_batch(self, i):
+            read_batches.append(i)
+            return self._reader.get_batch(i)
+
+    monkeypatch.setattr(pa.ipc, "open_file", SpyReader)
+    result = filetype.get_class("a").from_bytes_stream(
+        stream, num_lines=num_lines, columns=["b"], where=Filter(where) if where else None
+    )
+    expected = data[data["a"] >= 30] if where else data
+    expected = expected.head(num_lines) if num_lines > 0 else expected.tail(-num_lines)
+    # Unless the rows are filtered, the rows of a tail keep their positions in the file
+    expected = expected[["b"]].reset_index(drop=True) if where else expected[["b"]]
+    pd.testing.assert_frame_equal(result.contents, expected)
+
+    num_batches = -(-abs(num_lines) // 10)
+    skipped_batches = 3 if where and num_lines > 0 else 0
+    assert len(read_batches) == num_batches + skipped_batches
+
+
+@pytest.mark.parametrize("num_lines", [3, 10, 25, -3, -10, -25])
+def test_orc_reads_only_needed_stripes(monkeypatch, num_lines: int, capsys) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i) for i in range(100)]})
+    stream = io.BytesIO()
+    orc.write_table(pa.Table.from_pandas(data), stream, stripe_size=1000, batch_size=10)
+
+    read_stripe = orc.ORCFile.read_stripe
+    read_stripes = []
+
+    def spy_read_stripe(self, n, columns=None):
+        read_stripes.append((n, columns))
+        return read_stripe(self, n, columns=columns)
+
+    monkeypatch.setattr(orc.ORCFile, "read_stripe", spy_read_stripe)
+    result = filetype.get_class("o").from_bytes_stream(stream, num_lines=num_lines, columns=["b"]).contents
+    expected = data.head(num_lines) if num_lines > 0 else data.tail(-num_lines)
+    pd.testing.assert_frame_equal(result, expected[["b"]])
+    assert len(read_stripes) == -(-abs(num_lines) // 10)
+    assert all(columns == ["b"] for _, columns in read_stripes)
+
+    assert filetype.get_class("o").describe_stream(stream)
+    output = capsys.readouterr().out
+    assert "# Rows: 100" in output
+    assert re.search(r"\|\s+b\s+\|\s+string\s+\|\s+0\s+\|\s+100\s+\|", output)
+
+
+def test_text_starting_with_orc_is_not_orc() -> None:
+    assert not filetype.get_class("o").is_valid_input(io.BytesIO(b"ORCID,name\n1,a\n"))
+
+
+@pytest.mark.parametrize("obj", [filetype.get_class("c"), filetype.get_class("jl")])
+@pytest.mark.parametrize("num_lines", [1, 3, 5, 8])
+def test_tail_of_piped_stream(obj: DataFile, data: pd.DataFrame, num_lines: int) -> None:
+    data = data.assign(b=["x\ny", "a", 'say "hi"\n', "d", "e,f"])
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    result = obj.from_bytes_stream(PeekableStream(stream), num_lines=-num_lines)
+    # The rows keep their positions in the file, like the tail of the whole file
+    expected = obj.from_bytes_stream(stream).contents.tail(num_lines)
+    pd.testing.assert_frame_equal(result.contents, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+def test_candidates_resolve_file_type(monkeypatch, obj: DataFile, data: pd.DataFrame) -> None:
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    candidates = [cls for _, cls in filetype.candidates(stream.read(filetype.max_signature_length))]
+    assert obj in candidates
+    assert next(cls for cls in candidates if cls.is_valid_input(stream)) is obj
+
+
+def test_candidates_check_signatures_before_text_sniffers(data: pd.DataFrame) -> None:
+    prefix = Convert.parquet(data).read(filetype.max_signature_length)
+    assert [code for code, _ in filetype.candidates(prefix, "file.csv")] == ["p", "c", "jl"]
+
+
+def test_sniff_json_lines_with_a_long_first_record() -> None:
+    stream = io.BytesIO(b'{"a": "%s"}\n{"a": "y"}\n' % (b"x" * 100_000))
+    assert CatFile(stream)._sniff_file_type() == "jl"
+
+
+@pytest.mark.parametrize("path", [None, "file.csv"])
+def test_sniff_falls_back_when_signatures_are_rejected(path: Optional[str]) -> None:
+    stream = io.BytesIO(b"ORC,b\n1,2\n3,4\n")
+    assert CatFile(stream, path=path)._sniff_file_type() == "c"
+
+
+def test_candidates_order_text_sniffers_by_extension() -> None:
+    assert [code for code, _ in filetype.candidates(b"{}", "events.jsonl.gz")][0] == "jl"
+    assert [code for code, _ in filetype.candidates(b"{}", "events.csv")][0] == "c"
+
+
+@pytest.mark.parametrize("sep", [",", "\t", ";", "|"])
+def test_csv_sniffed_dialect_is_reused(data: pd.DataFrame, sep: str) -> None:
+    csv = filetype.get_class("c")
+    stream = io.BytesIO(data.to_csv(index=False, sep=sep).encode())
+    assert csv.is_valid_input(stream)
+
+    options = csv.sniffed_options(stream)
+    assert options["delimiter"] == sep
+    assert list(csv.from_bytes_stream(stream, **options).columns) == list(data.columns)
+
+
+@pytest.mark.parametrize("where", [None, "ts >= '2026-01-03'"])
+@pytest.mark.parametrize("piped", [True, False])
+def test_csv_engines_agree(data: pd.DataFrame, piped: bool, where: Optional[str]) -> None:
+    csv = filetype.get_class("c")
+    data = data.assign(b=["x\ny", "a", 'say "hi"\n', "d", "e,f"], ts=[f"2026-01-0{i + 1}" for i in range(5)])
+    # A text column with blank and NA-like cells
+    data = data.assign(d=["x", None, "NA", "", "y"])
+    results = []
+    for engine in ["pandas", "pyarrow"]:
+        stream = Convert.csv(data)
+        result = csv.from_bytes_stream(
+            PeekableStream(stream) if piped else stream, engine=engine, where=Filter(where) if where else None
+        ).contents
+        results.append(result.reset_index(drop=True))
+    pd.testing.assert_frame_equal(*results, check_dtype=False)
+    assert len(results[0]) == (3 if where else 5)
+    assert results[0]["d"].isnull().sum() == (2 if where else 3)
+
+
+def test_csv_parallel_engine_agrees(monkeypatch, data: pd.DataFrame) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: 7)
+    csv = filetype.get_class("c")
+    data = data.assign(b=["x\ny", "a", 'say "hi"\n', "d", "e,f"], ts=[f"2026-01-0{i + 1}" for i in range(5)])
+    # A text column with blank and NA-like cells
+    data = data.assign(d=["x", None, "NA", "", "y"])
+    data = pd.concat([data] * 1000, ignore_index=True)
+    expected = csv.from_bytes_stream(Convert.csv(data), engine="pandas").contents
+    result = csv.from_bytes_stream(Convert.csv(data), engine="parallel").contents
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [{"a": 1, "b": None}] * 3 + [{"a": 2, "b": "late"}],
+        [{"a": 1}, {"a": "mixed"}, {"a": 2.5}],
+        [{"a": i, "nested": {"x": i, "y": [i]}} for i in range(3)],
+    ],
+)
+def test_json_lines_records(records) -> None:
+    stream = io.BytesIO(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+    result = filetype.get_class("jl").from_bytes_stream(stream).contents
+    assert result.shape[0] == len(records)
+    assert result.iloc[-1].to_dict() == records[-1]
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "parallel"])
+def test_json_lines_keep_dates_as_strings(monkeypatch, engine: str) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: 3)
+    record = {"ts": "2026-01-01T10:00:00+02:00", "nested": {"day": "2026-01-01"}, "days": ["2026-01-02"]}
+    records = [record] * 10_000 + [{**record, "late": "2026-01-03 10:00:00"}]
+    stream = io.BytesIO(b"".join(json.dumps(r).encode() + b"\n" for r in records))
+    result = filetype.get_class("jl").from_bytes_stream(stream, engine=engine).contents
+    assert result.iloc[0][["ts", "nested"]].to_dict() == {"ts": record["ts"], "nested": record["nested"]}
+    assert list(result.iloc[0]["days"]) == record["days"]
+    assert isinstance(result.iloc[-1]["late"], str)
+
+
+def test_json_lines_parallel_engine_agrees(monkeypatch, data: pd.DataFrame) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: 7)
+    json_lines = filetype.get_class("jl")
+    data = pd.concat([data] * 1000, ignore_index=True)
+    expected = json_lines.from_bytes_stream(Convert.json_lines(data), engine="pyarrow").contents
+    result = json_lines.from_bytes_stream(Convert.json_lines(data), engine="parallel").contents
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("columns", [None, ["b", "a"]])
+@pytest.mark.parametrize("where", [None, "a >= 2 and b != 'd'"])
+def test_parquet_parallel_engine_agrees(monkeypatch, data: pd.DataFrame, columns, where) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: 7)
+    parquet = filetype.get_class("p")
+    stream = io.BytesIO()
+    pd.concat([data] * 1000, ignore_index=True).to_parquet(stream, row_group_size=100)
+    where = Filter(where) if where is not None else None
+    expected = parquet.from_bytes_stream(stream, engine="pyarrow", columns=columns, where=where).contents
+    result = parquet.from_bytes_stream(stream, engine="parallel", columns=columns, where=where).contents
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "parallel"])
+@pytest.mark.parametrize("num_lines", [None, 2, -2])
+def test_parquet_where_missing_column(monkeypatch, data: pd.DataFrame, engine: str, num_lines: Optional[int]) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: 7)
+    stream = Convert.parquet(data)
+    with pytest.raises(ColumnNotFoundError):
+        filetype.get_class("p").from_bytes_stream(stream, engine=engine, num_lines=num_lines, where=Filter("z > 1"))
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+@pytest.mark.parametrize("num_lines", [None, 2, -2])
+def test_column_projection(obj: DataFile, data: pd.DataFrame, num_lines: Optional[int]) -> None:
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    result = obj.from_bytes_stream(stream, num_lines=num_lines, columns=["b", "a"])
+    assert result.columns == ("b", "a")
+    assert set(result.contents["b"]) <= set(data["b"])
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+def test_column_projection_missing_column(obj: DataFile, data: pd.DataFrame) -> None:
+    with pytest.raises(Exception):
+        obj.from_bytes_stream(getattr(Convert, obj.__name__.lower())(data), columns=["a", "missing"])
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+@pytest.mark.parametrize("num_lines", [None, 1])
+def test_where_filter(obj: DataFile, data: pd.DataFrame, num_lines: Optional[int]) -> None:
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    result = obj.from_bytes_stream(stream, num_lines=num_lines, columns=["b"], where=Filter("a >= 1 and b != 'c'"))
+    assert result.columns == ("b",)
+    assert list(result[:num_lines]["b"]) == ["b", "d", "e"][:num_lines]
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("a != 1", [2]),
+        ("s not in ('A',)", [2]),
+        ("not (a == 1)", [2]),
+        ("not (a == 1 or s == 'B')", []),
+        ("a == None", [1]),
+        ("a != None or s != 'A'", [0, 2]),
+    ],
+)
+def test_where_filter_nulls_match_in_pandas_and_arrow(expression: str, expected: List[int]) -> None:
+    data = pd.DataFrame({"i": [0, 1, 2], "a": [1, None, 3], "s": ["A", None, "B"]})
+    where = Filter(expression)
+    assert list(data[where.to_mask(data)]["i"]) == expected
+    table = pa.Table.from_pandas(data)
+    assert table.filter(where.to_arrow(table.schema))["i"].to_pylist() == expected
+
+
+def test_where_skips_parquet_row_groups(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i) for i in range(100)]})
+    stream = io.BytesIO()
+    data.to_parquet(stream, row_group_size=10)
+
+    read_row_groups = pq.ParquetFile.read_row_groups
+    read = []
+
+    def spy(self, row_groups, *args, **kwargs):
+        read.extend(row_groups)
+        return read_row_groups(self, row_groups, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "read_row_groups", spy)
+    result = filetype.get_class("p").from_bytes_stream(stream, where=Filter("a in (5, 95) or (a > 41 and a <= 43)"))
+    assert list(result.contents["a"]) == [5, 42, 43, 95]
+    assert read == [0, 4, 9]
+
+
+@pytest.mark.parametrize("expression", ["a +", "a + 1 == 2", "a == b", "len(a) == 1", "a in 3", "a is None"])
+def test_invalid_where_filter(expression: str) -> None:
+    with pytest.raises(InvalidFilterError):
+        Filter(expression)
+
+
+def test_parquet_describe_from_footer(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i % 7) for i in range(100)]})
+    stream = io.BytesIO()
+    data.to_parquet(stream, row_group_size=10)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The data should not be loaded")
+
+    monkeypatch.setattr(pq, "read_table", fail)
+    assert filetype.get_class("p").describe_stream(stream, columns=["a", "b"])
+    output = capsys.readouterr().out
+    assert "# Rows: 100" in output
+    assert re.search(r"\|\s+a\s+\|\s+int64\s+\|\s+0\s+\|\s+100\s+\|\s+0\s+\|\s+99\s+\|", output)
+    assert re.search(r"\|\s+b\s+\|\s+\w+\s+\|\s+0\s+\|\s+7\s+\|\s+0\s+\|\s+6\s+\|", output)
+
+
+def test_arrow_describe_from_record_batches(capsys: pytest.CaptureFixture) -> None:
+    data = pd.DataFrame({"a": list(range(100)), "b": [str(i % 7) if i % 10 else None for i in range(100)]})
+    stream = Convert.arrow(data)
+    assert filetype.get_class("a").describe_stream(stream, columns=["b", "a"])
+    output = capsys.readouterr().out
+    assert "# Rows: 100" in output
+    assert re.search(r"\|\s+a\s+\|\s+int64\s+\|\s+0\s+\|\s+100\s+\|", output)
+    assert re.search(r"\|\s+b\s+\|\s+\w+\s+\|\s+10\s+\|\s+7\s+\|", output)
+
+
+@pytest.mark.parametrize("obj", filetype.objects)
+def test_schema(obj: DataFile, data: pd.DataFrame, capsys: pytest.CaptureFixture) -> None:
+    stream = getattr(Convert, obj.__name__.lower())(data)
+    if not obj.schema_stream(stream):
+        obj.from_bytes_stream(stream).schema()
+    output = capsys.readouterr().out
+    assert all(re.search(rf"\|\s+{column}\s+\|", output) for column in data.columns)
+
+
+@pytest.mark.parametrize("num_lines", [None, 3, -3])
+def test_parquet_dictionary_columns_load_as_categoricals(num_lines: Optional[int], capsys) -> None:
+    data = pd.DataFrame({"a": [f"value {i}" for i in range(1000)], "b": list("xyz") * 333 + [None]})
+    stream = io.BytesIO()
+    data.to_parquet(stream, row_group_size=100)
+    parquet = filetype.get_class("p")
+
+    result = parquet.from_bytes_stream(stream, num_lines=num_lines, where=Filter("b in ('x', 'z')")).contents
+    assert isinstance(result["b"].dtype, pd.CategoricalDtype)
+    assert not isinstance(result["a"].dtype, pd.CategoricalDtype)
+    assert set(result["b"]) == {"x", "z"}
+
+    assert parquet.describe_stream(stream, columns=["b"])
+    output = capsys.readouterr().out
+    assert re.search(r"\|\s+b\s+\|\s+(large_)?string\s+\|\s+1\s+\|\s+3\s+\|", output)
+    assert parquet.schema_stream(stream, columns=["b"])
+    assert "dictionary" not in capsys.readouterr().out
+
+
+@pytest.fixture
+def nested_data() -> pa.Table:
+    return pa.table(
+        {
+            "id": [1, 2, 3],
+            "event": [{"user": {"name": "a", "age": 1}, "t": 1.0}, {"user": {"name": "b", "age": 2}, "t": 2.0}, None],
+            "tags": [["x"], ["y", "z"], []],
+        }
+    )
+
+
+@pytest.mark.parametrize("code", ["p", "jl"])
+@pytest.mark.parametrize("num_lines", [None, 2, -2])
+def test_flatten(nested_data: pa.Table, code: str, num_lines: Optional[int]) -> None:
+    stream = io.BytesIO()
+    if code == "p":
+        pq.write_table(nested_data, stream, row_group_size=2)
+    else:
+        stream.write(b"".join(json.dumps(record).encode() + b"\n" for record in nested_data.to_pylist()))
+    stream.seek(0)
+    assert CatFile(stream)._sniff_file_type() == code
+
+    obj = filetype.get_class(code)
+    result = obj.from_bytes_stream(stream, num_lines=num_lines, flatten=True)
+    assert result.columns == ("id", "event.user.name", "event.user.age", "event.t", "tags")
+
+    result = obj.from_bytes_stream(
+        stream, num_lines=num_lines, flatten=True, columns=["event.user.name"], where=Filter("event.user.age >= 2")
+    )
+    assert list(result.contents["event.user.name"]) == ["b"]
+
+
+@pytest.fixture
+def workbook(data: pd.DataFrame) -> io.BytesIO:
+    stream = io.BytesIO()
+    with pd.ExcelWriter(stream) as f:
+        data.to_excel(f, sheet_name="First", index=False)
+        data.assign(d=data["a"] * 2).to_excel(f, sheet_name="Second", index=False)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.parametrize("sheet", ["Second", "1"])
+@pytest.mark.parametrize("num_lines", [None, 2])
+def test_excel_sheet(workbook: io.BytesIO, sheet: str, num_lines: Optional[int]) -> None:
+    result = filetype.get_class("xl").from_bytes_stream(workbook, sheet=sheet, num_lines=num_lines)
+    assert result.columns == ("a", "b", "c", "d")
+    assert list(result.contents["d"]) == [0, 2, 4, 6, 8][:num_lines]
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"num_lines": 2}, {"num_lines": 4}, {"num_lines": -3}, {"columns": ["e", "a"]}, {"sheet": "1"}]
+)
+def test_excel_native_engine_agrees(options: dict) -> None:
+    excel = filetype.get_class("xl")
+    data = pd.DataFrame(
+        {
+            "a": [1, 2, None, 4, 5],
+            "b": ["x", None, None, "y", "z"],
+            "c": [None] * 5,
+            "d": pd.to_datetime(["2021-01-02 03:04", None, None, "2022-05-06 00:00", "2023-07-08 12:00"]),
+            "e": [True, False, None, True, False],
+        }
+    )
+    stream = io.BytesIO()
+    with pd.ExcelWriter(stream) as f:
+        # A blank row in the middle of the sheet, and blank rows at its end
+        data.iloc[[0, 1]].to_excel(f, index=False)
+        data.iloc[3:].to_excel(f, index=False, header=False, startrow=4)
+        data.assign(d=data["a"] * 2).to_excel(f, sheet_name="Second", index=False)
+    stream.seek(0)
+
+    expected = excel.from_bytes_stream(stream, engine="openpyxl", **options).contents
+    if options.get("num_lines", 0) < 0:
+        # The openpyxl engine loads the whole sheet, which is then printed from its end
+        expected = expected.tail(-options["num_lines"])
+    result = excel.from_bytes_stream(stream, engine="native", **options).contents
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("cpu_count", [1, 7])
+def test_excel_all_sheets(monkeypatch, workbook: io.BytesIO, cpu_count: int, capsys) -> None:
+    monkeypatch.setattr("os.cpu_count", lambda: cpu_count)
+    excel = filetype.get_class("xl")
+    sheets = list(excel.sheets_from_bytes_stream(workbook, num_lines=2, columns=["a", "b"]))
+    assert [name for name, _ in sheets] == ["First", "Second"]
+    assert all(list(sheet.contents["a"]) == [0, 1] for _, sheet in sheets)
+
+    with pytest.raises(ColumnNotFoundError):
+        list(excel.sheets_from_bytes_stream(workbook, columns=["d"]))
+
+    CatFile(workbook, describe=True, all_sheets=True).run()
+    output = capsys.readouterr().out
+    assert output.index("Sheet: First") < output.index("# Columns: 3") < output.index("Sheet: Second")
+    assert "# Columns: 4" in output
+
+
+def test_excel_missing_sheet(workbook: io.BytesIO) -> None:
+    with pytest.raises(SheetNotFoundError):
+        filetype.get_class("xl").from_bytes_stream(workbook, sheet="Third")
+
+
+def test_excel_list_sheets_and_describe_from_metadata(workbook: io.BytesIO, monkeypatch, capsys) -> None:
+    def fail(*args, **kwargs):
+        raise AssertionError("The cells should not be loaded")
+
+    monkeypatch.setattr(pd, "read_excel", fail)
+    excel = filetype.get_class("xl")
+    assert excel.list_sheets_stream(workbook)
+    output = capsys.readouterr().out
+    assert re.search(r"\|\s+0\s+\|\s+First\s+\|\s+5\s+\|\s+3\s+\|", output)
+    assert re.search(r"\|\s+1\s+\|\s+Second\s+\|\s+5\s+\|\s+4\s+\|", output)
+
+    assert not excel.describe_stream(workbook, sheet="Second")
+    assert excel.describe_stream(workbook, sheet="Second", metadata_only=True)
+    output = capsys.readouterr().out
+    assert "# Rows: 5" in output and "# Columns: 4" in output
+    assert all(re.search(rf"\|\s+{column}\s+\|", output) for column in "abcd")
+
+
+@pytest.mark.parametrize("engine", [None, "native"])
+def test_excel_ods_workbook_is_not_read_as_xlsx(monkeypatch, engine: Optional[str]) -> None:
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+        archive.writestr("content.xml", "<office:document-content/>")
+    stream.seek(0)
+    calls = []
+    monkeypatch.setattr(pd, "read_excel", lambda *args, **kwargs: calls.append(kwargs) or pd.DataFrame({"a": [1]}))
+
+    excel = filetype.get_class("xl")
+    # However large the workbook is, only xlsx workbooks are loaded with the native engine
+    monkeypatch.setattr(excel, "NATIVE_ENGINE_MIN_SIZE", 0)
+    assert not excel.describe_stream(stream, sheet="Sheet1", metadata_only=True)
+    assert excel.from_bytes_stream(stream, sheet="Sheet1", engine=engine).columns == ("a",)
+    assert calls[0]["sheet_name"] == "Sheet1"
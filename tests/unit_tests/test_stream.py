@@ -1,13 +1,25 @@
+import bz2
+import gzip
 import io
+import lzma
 import os
+import struct
 import sys
+import zlib
 from pathlib import Path
 from tempfile import gettempdir
 from typing import Optional
 
 import pytest
 
+from cat_file.stream import decompress_stream
+from cat_file.stream import iter_records
 from cat_file.stream import load_file_stream
+from cat_file.stream import MemoryMappedFile
+from cat_file.stream import PeekableStream
+from cat_file.stream import read_prefix
+from cat_file.stream import read_text_sample
+from cat_file.stream import split_records
 from cat_file.stream import zero_buffer
 
 
@@ -40,3 +52,144 @@ def test_zero_buffer(read_position: int):
         assert b.read() == data  # Assert buffer was zeroed out
 
     assert buffer.tell() == read_position
+
+
+def test_load_file_stream_memory_maps_path():
+    data = b"fake mapped data"
+    path = os.path.join(gettempdir(), "cat-file_mmap.txt")
+    Path(path).write_bytes(data)
+
+    result = load_file_stream(path)
+    assert isinstance(result, MemoryMappedFile)
+    assert result.getbuffer().readonly
+    assert bytes(result.getbuffer()) == data
+    assert result.read(4) == data[:4]
+    assert result.readline() == data[4:]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="FIFOs are not supported")
+def test_load_file_stream_streams_fifo(tmp_path: Path):
+    data = b"a,b\n1,2\n"
+    path = tmp_path / "cat-file.fifo"
+    os.mkfifo(path)
+    writer_fd = os.open(path, os.O_RDWR)  # Lets the path be opened for reading without blocking
+    os.write(writer_fd, data)
+    try:
+        result = load_file_stream(str(path))
+        os.close(writer_fd)
+        writer_fd = None
+        assert isinstance(result, PeekableStream)
+        assert read_prefix(result, 3) == data[:3]
+        assert result.read() == data
+    finally:
+        if writer_fd is not None:
+            os.close(writer_fd)
+
+
+def test_load_file_stream_memory_maps_redirected_stdin(monkeypatch):
+    data = b"fake redirected data"
+    path = os.path.join(gettempdir(), "cat-file_redirect.txt")
+    Path(path).write_bytes(data)
+
+    with open(path, "rb") as f:
+        monkeypatch.setattr("sys.stdin", f)
+        result = load_file_stream()
+
+    assert isinstance(result, MemoryMappedFile)
+    assert result.read() == data
+
+
+def test_peekable_stream_replays_prefix():
+    data = b"first line\nsecond line\nthird line\n"
+    source = io.BytesIO(data)
+    stream = PeekableStream(source)
+
+    assert read_prefix(stream, 5) == data[:5]
+    assert read_prefix(stream, 15) == data[:15]
+    assert source.tell() == 15  # Only the peeked prefix was pulled from the source
+
+    with zero_buffer(stream) as b:
+        assert b.readline() == b"first line\n"
+        assert b.readline() == b"second line\n"
+        assert b.read() == b"third line\n"
+    assert not stream.seekable()
+
+
+def test_iter_records_is_quote_aware():
+    data = b'a,b\n1,"x\ny"\n\n2,"say ""hi"""\n3,z'
+    assert list(iter_records(io.BytesIO(data), quotechar=b'"')) == [
+        b"a,b\n",
+        b'1,"x\ny"\n',
+        b'2,"say ""hi"""\n',
+        b"3,z",
+    ]
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+@pytest.mark.parametrize("piped", [True, False])
+def test_load_file_stream_decompresses(monkeypatch, compress, piped: bool):
+    data = b"a,b\n" + b"1,2\n" * 1000
+    path = os.path.join(gettempdir(), "cat-file_compressed")
+    Path(path).write_bytes(compress(data))
+
+    if piped:
+        monkeypatch.setattr("sys.stdin", type("mock_stdin", (), {"buffer": io.BytesIO(compress(data))}))
+        result = load_file_stream()
+    else:
+        result = load_file_stream(path)
+
+    assert read_prefix(result, 4) == b"a,b\n"
+    assert result.read() == data
+
+
+def bgzf_compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    block_size = 18 + len(body) + 8
+    header = b"\x1f\x8b\x08\x04" + bytes(6) + struct.pack("<H", 6) + b"BC" + struct.pack("<HH", 2, block_size - 1)
+    return header + body + struct.pack("<II", zlib.crc32(data), len(data))
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bgzf_compress])
+def test_decompress_stream_multi_member_gzip(compress):
+    members = [b"%d,some,row\n" % i * 1000 for i in range(50)]
+    stream = decompress_stream(io.BytesIO(b"".join(compress(member) for member in members)))
+
+    assert read_prefix(stream, 8) == members[0][:8]
+    assert stream.read() == b"".join(members)
+
+
+def test_decompress_stream_ignores_stray_gzip_magic_bytes(monkeypatch):
+    # Stored blocks keep the data as is, so the compressed data contains a plausible gzip header
+    data = b"a,b\n" + gzip.compress(b"")[:10] + b"\xff" * 100 + b"\n" * 100
+    compressed = gzip.compress(data, compresslevel=0)
+    assert compressed.count(b"\x1f\x8b\x08") == 2
+
+    monkeypatch.setattr("cat_file.stream.ParallelGzipReader", None)  # Fails if used
+    assert decompress_stream(io.BytesIO(compressed)).read() == data
+
+
+def test_read_text_sample_is_bounded_to_complete_records():
+    data = 'a,b\n1,"x\ny"\n2,"éé"\n'.encode()
+    assert read_text_sample(io.BytesIO(data), quotechar=b'"') == ["a,b\n", '1,"x\ny"\n', '2,"éé"\n']
+    assert read_text_sample(io.BytesIO(data), quotechar=b'"', size=len(data) - 3) == ["a,b\n", '1,"x\ny"\n']
+    assert read_text_sample(io.BytesIO(b"\xff\xfe\n")) is None
+
+
+def test_read_text_sample_grows_for_a_long_first_record():
+    records = ['{"a": "%s"}\n' % ("x" * 100_000), '{"a": "y"}\n']
+    data = "".join(records).encode()
+    assert read_text_sample(io.BytesIO(data), size=1024) == records
+    assert read_text_sample(PeekableStream(io.BytesIO(data)), size=1024) == records
+
+
+def test_split_records_aligns_ranges_to_records():
+    data = b'a,"x\ny"\n' * 100 + b'b,"' + b"\n" * 200 + b'"\n'
+    for quotechar in (b'"', None):
+        ranges = split_records(memoryview(data), 8, quotechar=quotechar)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        if quotechar is not None:
+            # A range inside the quoted newlines has no record boundary, so it is merged into the previous one
+            assert all(data[start : start + 1] in (b"a", b"b") for start, _ in ranges)
+            assert len(ranges) < 8